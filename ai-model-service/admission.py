@@ -0,0 +1,387 @@
+"""
+Deadline-aware admission control and per-tenant fair scheduling.
+
+Interactive scoring requests are queued per tenant and dispatched by a
+single loop using deficit round robin over weighted tenant queues. When a
+rate is configured (TENANT_RATE), a token bucket in rows per second also
+limits each tenant; without one tenants are only bounded by their queue
+size, since untagged clients all share DEFAULT_TENANT. Bulk work from the
+batch and streaming endpoints is queued separately and charged one token
+per submitted chunk, so large batches neither drain the interactive
+budget nor fill the interactive queue. Requests queued
+at the same time are coalesced into one micro-batch for the inference
+backend. Work whose deadline has passed is dropped before it is scored.
+
+Tenant ids come from unauthenticated headers, so the tracked set is
+bounded: with an allow-list, other ids share DEFAULT_TENANT; otherwise
+idle tenants (nothing queued, bucket refilled) are expired once
+max_tenants are tracked, and new ids share DEFAULT_TENANT while none can
+be expired.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "anonymous"
+
+
+class DeadlineExceeded(Exception):
+    """The request deadline passed before the work was scheduled"""
+
+
+class QueueFull(Exception):
+    """The tenant already has too much work queued"""
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, cost, now):
+        self._refill(now)
+        # A full bucket admits work larger than the burst so big batches are not starved,
+        # but the debt is capped so the tenant recovers within two burst periods
+        if self.tokens >= cost or self.tokens >= self.burst:
+            self.tokens = max(self.tokens - cost, -self.burst)
+            return True
+        return False
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+    def time_until(self, cost):
+        return max(0.0, (min(cost, self.burst) - self.tokens) / self.rate)
+
+
+def _timed_predict(predict_proba, X):
+    """Run predict_proba and return its result with the seconds it took"""
+    start = time.perf_counter()
+    probabilities = predict_proba(X)
+    return probabilities, time.perf_counter() - start
+
+
+class WorkItem:
+    __slots__ = ("tenant", "features", "backend", "bulk", "deadline", "future", "enqueued_at", "service_time")
+
+    def __init__(self, tenant, features, backend, bulk, deadline, future, enqueued_at, service_time=None):
+        self.tenant = tenant
+        self.features = features
+        self.backend = backend
+        self.bulk = bulk
+        self.deadline = deadline
+        self.future = future
+        self.enqueued_at = enqueued_at
+        self.service_time = service_time
+
+
+class TenantStats:
+    def __init__(self):
+        self.queued_rows = 0
+        self.queued_bulk_rows = 0
+        self.served_requests = 0
+        self.served_rows = 0
+        self.shed_expired = 0
+        self.shed_rejected = 0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=1024)
+
+    def unqueue(self, item):
+        if item.bulk:
+            self.queued_bulk_rows -= len(item.features)
+        else:
+            self.queued_rows -= len(item.features)
+
+    def record_wait(self, seconds):
+        self.recent_waits.append(seconds)
+        self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self):
+        waits_ms = np.array(self.recent_waits) * 1000 if self.recent_waits else np.zeros(1)
+        return {
+            "queued_rows": self.queued_rows,
+            "queued_bulk_rows": self.queued_bulk_rows,
+            "served_requests": self.served_requests,
+            "served_rows": self.served_rows,
+            "shed_expired": self.shed_expired,
+            "shed_rejected": self.shed_rejected,
+            "queue_wait_ms": {
+                "p50": float(np.percentile(waits_ms, 50)),
+                "p95": float(np.percentile(waits_ms, 95)),
+                "max": self.max_wait * 1000,
+            },
+        }
+
+
+class FairScheduler:
+    """Weighted fair, deadline-aware micro-batching dispatcher"""
+
+    def __init__(self, get_backend, weights=None, rate=None, burst=400.0,
+                 max_queue_rows=2000, max_batch_rows=256, quantum=16,
+                 allowed_tenants=None, max_tenants=1000, max_bulk_queue_rows=65536):
+        self.get_backend = get_backend
+        self.weights = weights or {}
+        self.allowed_tenants = set(allowed_tenants) if allowed_tenants else None
+        self.max_tenants = max_tenants
+        self.last_expiry = 0.0
+        self.rate = rate
+        self.burst = burst
+        self.max_queue_rows = max_queue_rows
+        self.max_bulk_queue_rows = max_bulk_queue_rows
+        self.max_batch_rows = max_batch_rows
+        self.quantum = quantum
+        self.queues = {}
+        self.buckets = {}
+        self.deficits = {}
+        self.tenant_stats = {}
+        self.active = deque()
+        self.batches = 0
+        self.batch_rows = 0
+        self.wakeup = None
+        self.task = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_event_loop().create_task(self._dispatch_loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.executor.shutdown(wait=False)
+
+    def _stats(self, tenant):
+        if tenant not in self.tenant_stats:
+            self.tenant_stats[tenant] = TenantStats()
+        return self.tenant_stats[tenant]
+
+    def _bucket(self, tenant):
+        """The tenant's token bucket, or None when rate limiting is off"""
+        if self.rate is None:
+            return None
+        if tenant not in self.buckets:
+            self.buckets[tenant] = TokenBucket(self.rate, self.burst)
+        return self.buckets[tenant]
+
+    def resolve_tenant(self, tenant):
+        """Map a client-supplied tenant id onto a bounded set of tracked tenants"""
+        if self.allowed_tenants is not None:
+            return tenant if tenant in self.allowed_tenants else DEFAULT_TENANT
+        if tenant in self.tenant_stats or len(self.tenant_stats) < self.max_tenants:
+            return tenant
+        self._expire_idle(time.monotonic())
+        return tenant if len(self.tenant_stats) < self.max_tenants else DEFAULT_TENANT
+
+    def _expire_idle(self, now):
+        """
+        Forget tenants with nothing queued and a full bucket; a fresh bucket
+        would be identical, so expiring them grants no extra burst
+        """
+        if now - self.last_expiry < 1.0:
+            return
+        self.last_expiry = now
+        for tenant in list(self.tenant_stats):
+            bucket = self.buckets.get(tenant)
+            stats = self.tenant_stats[tenant]
+            if tenant in self.active or stats.queued_rows or stats.queued_bulk_rows:
+                continue
+            if bucket is not None and not bucket.is_full(now):
+                continue
+            for table in (self.tenant_stats, self.buckets, self.queues, self.deficits):
+                table.pop(tenant, None)
+
+    async def submit(self, tenant, features, deadline=None, backend=None, bulk=False, service_time=None):
+        """
+        Queue an (N, 6) feature array for `tenant` and wait for its
+        probabilities. `deadline` is an absolute time.monotonic() value;
+        `backend` defaults to the primary backend. Only work for the same
+        backend is coalesced into a micro-batch. `bulk` work costs one token
+        per call and is limited by its own queue bound. If `service_time` is
+        a list, this item's row share of the predict_proba time is appended
+        to it, excluding queue wait and throttling.
+        """
+        tenant = self.resolve_tenant(tenant)
+        stats = self._stats(tenant)
+        rows = len(features)
+        queued = stats.queued_bulk_rows if bulk else stats.queued_rows
+        if queued and queued + rows > (self.max_bulk_queue_rows if bulk else self.max_queue_rows):
+            stats.shed_rejected += 1
+            raise QueueFull(f"Tenant {tenant} has {queued} {'bulk ' if bulk else ''}rows queued")
+        if deadline is not None and deadline <= time.monotonic():
+            stats.shed_expired += 1
+            raise DeadlineExceeded("Deadline passed before the request was queued")
+
+        item = WorkItem(
+            tenant, features, backend or self.get_backend(), bulk, deadline,
+            asyncio.get_event_loop().create_future(), time.monotonic(), service_time
+        )
+        self.queues.setdefault(tenant, deque()).append(item)
+        if bulk:
+            stats.queued_bulk_rows += rows
+        else:
+            stats.queued_rows += rows
+        if tenant not in self.active:
+            self.active.append(tenant)
+        self.wakeup.set()
+        return await item.future
+
+    def _discard(self, tenant, queue, now):
+        """Drop cancelled work and fail work whose deadline has passed"""
+        stats = self._stats(tenant)
+        kept = deque()
+        for item in queue:
+            if item.future.done():
+                stats.unqueue(item)
+            elif item.deadline is not None and item.deadline <= now:
+                stats.unqueue(item)
+                stats.shed_expired += 1
+                item.future.set_exception(DeadlineExceeded("Deadline passed while queued"))
+            else:
+                kept.append(item)
+        self.queues[tenant] = kept
+        return kept
+
+    def _collect_batch(self):
+        """
+        Run deficit round robin rounds until a micro-batch is formed or all
+        queued tenants are throttled. Returns (batch, seconds to wait).
+        """
+        now = time.monotonic()
+        batch, rows = [], 0
+        wait = None
+
+        while not batch and self.active:
+            needs_deficit = False
+            for tenant in list(self.active):
+                queue = self._discard(tenant, self.queues[tenant], now)
+                bucket = self._bucket(tenant)
+                stats = self._stats(tenant)
+                if queue:
+                    self.deficits[tenant] = self.deficits.get(tenant, 0.0) + self.quantum * self.weights.get(tenant, 1.0)
+
+                while queue and rows < self.max_batch_rows:
+                    item = queue[0]
+                    item_rows = len(item.features)
+                    if item_rows > self.deficits[tenant]:
+                        needs_deficit = True
+                        break
+                    if rows and (rows + item_rows > self.max_batch_rows or item.backend is not batch[0].backend):
+                        break
+                    cost = 1 if item.bulk else item_rows
+                    if bucket is not None and not bucket.try_take(cost, now):
+                        delay = bucket.time_until(cost)
+                        wait = delay if wait is None else min(wait, delay)
+                        break
+                    queue.popleft()
+                    self.deficits[tenant] -= item_rows
+                    stats.unqueue(item)
+                    stats.record_wait(now - item.enqueued_at)
+                    batch.append(item)
+                    rows += item_rows
+
+                if not queue:
+                    self.active.remove(tenant)
+                    self.deficits[tenant] = 0.0
+                if rows >= self.max_batch_rows:
+                    break
+
+            if not needs_deficit:
+                break
+
+        # Start the next round with a different tenant
+        self.active.rotate(-1)
+        return batch, wait
+
+    async def _dispatch_loop(self):
+        while True:
+            await self.wakeup.wait()
+            try:
+                batch, wait = self._collect_batch()
+                if batch:
+                    await self._run_batch(batch)
+                elif self.active:
+                    await asyncio.sleep(wait or 0.001)
+                else:
+                    self.wakeup.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler dispatch error: {str(e)}")
+
+    async def _run_batch(self, batch):
+        X = batch[0].features if len(batch) == 1 else np.vstack([item.features for item in batch])
+        try:
+            probabilities, seconds = await asyncio.get_event_loop().run_in_executor(
+                self.executor, _timed_predict, batch[0].backend.predict_proba, X
+            )
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        offset = 0
+        for item in batch:
+            item_rows = len(item.features)
+            if item.service_time is not None:
+                item.service_time.append(seconds * item_rows / len(X))
+            if not item.future.done():
+                item.future.set_result(probabilities[offset:offset + item_rows])
+            stats = self._stats(item.tenant)
+            stats.served_requests += 1
+            stats.served_rows += item_rows
+            offset += item_rows
+        self.batches += 1
+        self.batch_rows += len(X)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "mean_batch_rows": self.batch_rows / self.batches if self.batches else 0.0,
+            "max_batch_rows": self.max_batch_rows,
+            "tenants": {tenant: stats.snapshot() for tenant, stats in self.tenant_stats.items()},
+        }
+
+
+def parse_weights(spec):
+    """Parse TENANT_WEIGHTS, e.g. "live-monitoring=4,bulk-sync=0.5" """
+    weights = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        tenant, _, weight = entry.partition("=")
+        if float(weight) <= 0:
+            raise ValueError(f"Tenant weight must be positive: {entry}")
+        weights[tenant.strip()] = float(weight)
+    return weights
+
+
+def create_scheduler(get_backend):
+    """Create a scheduler configured from TENANT_* and MICROBATCH_* environment variables"""
+    allowed_tenants = [tenant.strip() for tenant in os.getenv("TENANT_ALLOWLIST", "").split(",") if tenant.strip()]
+    return FairScheduler(
+        get_backend,
+        weights=parse_weights(os.getenv("TENANT_WEIGHTS", "")),
+        rate=float(os.getenv("TENANT_RATE")) if os.getenv("TENANT_RATE") else None,
+        burst=float(os.getenv("TENANT_BURST", "400")),
+        max_queue_rows=int(os.getenv("TENANT_MAX_QUEUE_ROWS", "2000")),
+        max_batch_rows=int(os.getenv("MICROBATCH_MAX_ROWS", "256")),
+        allowed_tenants=allowed_tenants or None,
+        max_tenants=int(os.getenv("TENANT_MAX_TRACKED", "1000")),
+        max_bulk_queue_rows=int(os.getenv("TENANT_MAX_BULK_QUEUE_ROWS", "65536")),
+    )
@@ -0,0 +1,276 @@
+"""
+Asynchronous batch scoring jobs backed by a local SQLite store.
+
+Jobs are submitted as (N, 6) feature arrays in model units, split into
+chunks and scored by background worker threads through the inference
+backend. Inputs, progress and results are persisted so queued or
+interrupted jobs resume after a restart.
+"""
+
+import io
+import os
+import time
+import uuid
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total_rows INTEGER NOT NULL,
+    processed_rows INTEGER NOT NULL DEFAULT 0,
+    chunk_size INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_inputs (
+    job_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, chunk_index)
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    p_low REAL NOT NULL,
+    p_mid REAL NOT NULL,
+    p_high REAL NOT NULL,
+    PRIMARY KEY (job_id, row_index)
+);
+"""
+
+def _to_blob(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+def _from_blob(blob):
+    return np.load(io.BytesIO(blob), allow_pickle=False)
+
+
+class JobStore:
+    """SQLite persistence for job metadata, chunked inputs and results"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def create_job(self, features, chunk_size):
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, total_rows, chunk_size, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, len(features), chunk_size, datetime.now().isoformat()),
+            )
+            conn.executemany(
+                "INSERT INTO job_inputs (job_id, chunk_index, data) VALUES (?, ?, ?)",
+                (
+                    (job_id, i, _to_blob(features[start:start + chunk_size]))
+                    for i, start in enumerate(range(0, len(features), chunk_size))
+                ),
+            )
+        return job_id
+
+    def get_job(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def load_chunk(self, job_id, chunk_index):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM job_inputs WHERE job_id = ? AND chunk_index = ?", (job_id, chunk_index)
+            ).fetchone()
+        return _from_blob(row["data"])
+
+    def save_chunk_results(self, job_id, first_row, probabilities):
+        """Store a scored chunk and advance progress in a single transaction"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, row_index, p_low, p_mid, p_high) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (job_id, first_row + i, float(p[0]), float(p[1]), float(p[2]))
+                    for i, p in enumerate(probabilities)
+                ),
+            )
+            conn.execute(
+                "UPDATE jobs SET processed_rows = ? WHERE id = ?", (first_row + len(probabilities), job_id)
+            )
+
+    def mark(self, job_id, status, error=None):
+        column = {"running": "started_at", "completed": "finished_at", "failed": "finished_at"}.get(status)
+        with self._connect() as conn:
+            if column:
+                conn.execute(
+                    f"UPDATE jobs SET status = ?, error = ?, {column} = ? WHERE id = ?",
+                    (status, error, datetime.now().isoformat(), job_id),
+                )
+            else:
+                conn.execute("UPDATE jobs SET status = ?, error = ? WHERE id = ?", (status, error, job_id))
+            if status == "completed":
+                conn.execute("DELETE FROM job_inputs WHERE job_id = ?", (job_id,))
+
+    def get_results(self, job_id, offset, limit):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT row_index, p_low, p_mid, p_high FROM job_results "
+                "WHERE job_id = ? AND row_index >= ? ORDER BY row_index LIMIT ?",
+                (job_id, offset, limit),
+            ).fetchall()
+        return [(row["row_index"], (row["p_low"], row["p_mid"], row["p_high"])) for row in rows]
+
+    def recover(self):
+        """Requeue jobs that were queued or interrupted while running"""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            rows = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row["id"] for row in rows]
+
+    def count_by_status(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class BatchJobRunner:
+    """
+    Background workers that score queued jobs chunk by chunk.
+
+    Workers yield to interactive requests: before each chunk they wait
+    (up to max_yield seconds) while any /predict call is in flight.
+    """
+
+    def __init__(self, store, get_backend, workers=1, chunk_size=1000, max_yield=0.05):
+        self.store = store
+        self.get_backend = get_backend
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_yield = max_yield
+        self.queue = queue.Queue()
+        self.threads = []
+        self.stopping = threading.Event()
+        self.idle = threading.Condition()
+        self.interactive_inflight = 0
+        self.rows_scored = 0
+        self.busy_seconds = 0.0
+        self.stats_lock = threading.Lock()
+
+    def start(self):
+        for job_id in self.store.recover():
+            self.queue.put(job_id)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"batch-job-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopping.set()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def submit(self, features):
+        job_id = self.store.create_job(features, self.chunk_size)
+        self.queue.put(job_id)
+        return job_id
+
+    @contextmanager
+    def interactive(self):
+        """Mark an interactive request as in flight for the duration of the block"""
+        with self.idle:
+            self.interactive_inflight += 1
+        try:
+            yield
+        finally:
+            with self.idle:
+                self.interactive_inflight -= 1
+                if self.interactive_inflight == 0:
+                    self.idle.notify_all()
+
+    def _yield_to_interactive(self):
+        with self.idle:
+            if self.interactive_inflight:
+                self.idle.wait_for(lambda: self.interactive_inflight == 0, timeout=self.max_yield)
+
+    def _worker(self):
+        while not self.stopping.is_set():
+            job_id = self.queue.get()
+            if job_id is None:
+                break
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Batch job {job_id} failed: {str(e)}")
+                self.store.mark(job_id, "failed", error=str(e))
+
+    def _run_job(self, job_id):
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return
+        self.store.mark(job_id, "running")
+
+        chunk_size = job["chunk_size"]
+        for chunk_index in range(job["processed_rows"] // chunk_size, -(-job["total_rows"] // chunk_size)):
+            if self.stopping.is_set():
+                return  # left as running; recover() requeues it on the next start
+            self._yield_to_interactive()
+
+            features = self.store.load_chunk(job_id, chunk_index)
+            start = time.perf_counter()
+            probabilities = self.get_backend().predict_proba(features)
+            elapsed = time.perf_counter() - start
+            self.store.save_chunk_results(job_id, chunk_index * chunk_size, probabilities)
+
+            with self.stats_lock:
+                self.rows_scored += len(features)
+                self.busy_seconds += elapsed
+
+        self.store.mark(job_id, "completed")
+        logger.info(f"Batch job {job_id} completed ({job['total_rows']} rows)")
+
+    def stats(self):
+        with self.stats_lock:
+            rows_scored, busy_seconds = self.rows_scored, self.busy_seconds
+        return {
+            "queue_depth": self.queue.qsize(),
+            "jobs": self.store.count_by_status(),
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "rows_scored": rows_scored,
+            "rows_per_second": rows_scored / busy_seconds if busy_seconds else 0.0,
+        }
+
+
+def create_job_runner(get_backend):
+    """Create a job runner configured from JOB_* environment variables"""
+    store = JobStore(os.getenv("JOB_DB_PATH", "batch_jobs.sqlite3"))
+    return BatchJobRunner(
+        store,
+        get_backend,
+        workers=int(os.getenv("JOB_WORKERS", "1")),
+        chunk_size=int(os.getenv("JOB_CHUNK_SIZE", "1000")),
+    )
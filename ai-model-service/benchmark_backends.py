@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Parity check and latency/throughput benchmark across inference backends.
+
+Each backend is compared against the code path it replaces:
+- xgboost: MaternalRiskPredictor.predict_risk() on one patient dict at a time
+- legacy:  the original per-feature Python normalization, one row at a time
+- onnx:    the xgboost backend on the pickle the ONNX file was exported from
+
+Usage: python benchmark_backends.py [backend ...]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+from inference_backends import FEATURES, LEGACY_RANGES, RISK_LEVELS, create_backend
+from retrain_model import create_synthetic_data
+
+PARITY_ROWS = 200
+LATENCY_ITERATIONS = 500
+BATCH_SIZES = [1, 64, 1024]
+
+# Maximum absolute probability difference tolerated per backend
+TOLERANCES = {"xgboost": 1e-6, "legacy": 1e-6, "onnx": 1e-4}
+
+def legacy_normalize_row(row):
+    """The pre-vectorization legacy normalization of a single row"""
+    normalized = []
+    for value, (min_val, max_val) in zip(row, LEGACY_RANGES.tolist()):
+        normalized_value = 2 * (value - min_val) / (max_val - min_val) - 1
+        normalized.append(max(-1, min(1, normalized_value)))
+    return np.array([normalized])
+
+def reference_proba(backend, X):
+    """Score rows one at a time through the pre-backend code path"""
+    if backend.name == "xgboost":
+        rows = []
+        for row in X:
+            result = backend.predictor.predict_risk(dict(zip(FEATURES, row)))
+            rows.append([result['probabilities'][level] for level in RISK_LEVELS])
+        return np.array(rows)
+    if backend.name == "legacy":
+        return np.vstack([
+            backend.model.predict_proba(legacy_normalize_row(row))[0]
+            for row in X
+        ])
+    if backend.name == "onnx":
+        source = create_backend("xgboost", os.getenv("MODEL_PATH"))
+        return source.predict_proba(X)
+    raise ValueError(f"No reference path for backend {backend.name}")
+
+def check_parity(backend, X):
+    """Compare a backend against its reference path"""
+    expected = reference_proba(backend, X)
+    actual = backend.predict_proba(X)
+    max_diff = float(np.max(np.abs(actual - expected)))
+    label_agreement = float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1)))
+    passed = max_diff <= TOLERANCES.get(backend.name, 1e-6) and label_agreement == 1.0
+    return passed, max_diff, label_agreement
+
+def measure_latency(backend, X):
+    """Single-row latency percentiles in milliseconds"""
+    timings = []
+    for i in range(LATENCY_ITERATIONS):
+        row = X[i % len(X)][np.newaxis, :]
+        start = time.perf_counter()
+        backend.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, [50, 95, 99])
+
+def measure_throughput(score, X, batch_size):
+    """Rows per second when scoring in batches of batch_size"""
+    batch = np.resize(X, (batch_size, X.shape[1]))
+    repeats = max(1, 2048 // batch_size)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        score(batch)
+    elapsed = time.perf_counter() - start
+    return batch_size * repeats / elapsed
+
+def run_benchmark(backend_names):
+    df = create_synthetic_data()
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    all_passed = True
+
+    print("🧪 Inference backend parity and benchmark")
+    print("=" * 80)
+
+    for name in backend_names:
+        try:
+            backend = create_backend(name)
+        except Exception as e:
+            print(f"\n⚠️  {name}: skipped ({e})")
+            continue
+
+        backend.warmup()
+        passed, max_diff, agreement = check_parity(backend, X[:PARITY_ROWS])
+        all_passed = all_passed and passed
+        p50, p95, p99 = measure_latency(backend, X)
+
+        print(f"\n{name} ({backend.model_type}, {backend.model_path})")
+        print(f"  Parity:   {'✅' if passed else '❌'} max |Δp| = {max_diff:.2e}, label agreement = {agreement * 100:.1f}%")
+        print(f"  Latency:  p50 {p50:.3f} ms | p95 {p95:.3f} ms | p99 {p99:.3f} ms")
+        for batch_size in BATCH_SIZES:
+            throughput = measure_throughput(backend.predict_proba, X, batch_size)
+            if backend.name == "legacy":
+                # Compare against the row-at-a-time path this backend replaced
+                reference = measure_throughput(lambda batch: reference_proba(backend, batch), X, batch_size)
+                print(f"  Batch {batch_size:>5}: {throughput:>12,.0f} rows/s (row loop {reference:,.0f} rows/s, {throughput / reference:.1f}x)")
+            else:
+                print(f"  Batch {batch_size:>5}: {throughput:>12,.0f} rows/s")
+
+    return all_passed
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or ["xgboost", "legacy", "onnx"]
+    sys.exit(0 if run_benchmark(names) else 1)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON vs MessagePack vs Arrow IPC batch payloads at 1k, 10k and 100k rows.
+
+Measures, in process, what /predict/batch spends on each format: decoding the
+request into the feature array, scoring it, and encoding the response.
+Requires msgpack and pyarrow to be installed.
+
+Usage: python benchmark_payloads.py [rows ...]
+"""
+
+import sys
+import json
+import time
+import msgpack
+import pyarrow as pa
+import numpy as np
+
+from inference_backends import FEATURES, create_backend
+from payload_codecs import (
+    ARROW_STREAM, FRONTEND_FIELDS, JSON, MSGPACK, encode_arrow, encode_json, encode_msgpack
+)
+from main import decode_batch_request
+from retrain_model import create_synthetic_data
+
+REPEATS = 3
+
+def frontend_columns(n_rows):
+    """Synthetic patients in frontend units (mg/dL, Celsius)"""
+    df = create_synthetic_data(n_rows)
+    return {
+        'age': df['Age'].to_numpy(),
+        'systolic_bp': df['SystolicBP'].to_numpy(),
+        'diastolic_bp': df['DiastolicBP'].to_numpy(),
+        'blood_sugar': df['BS'].to_numpy() * 18,
+        'body_temp': (df['BodyTemp'].to_numpy() - 32) * 5 / 9,
+        'heart_rate': df['HeartRate'].to_numpy(),
+    }, df[FEATURES].to_numpy(dtype=np.float64)
+
+def arrow_bytes(batch):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def request_bodies(columns, model_features):
+    records = [dict(zip(FRONTEND_FIELDS, row)) for row in np.column_stack([columns[f] for f in FRONTEND_FIELDS]).tolist()]
+    features_column = pa.FixedSizeListArray.from_arrays(pa.array(model_features.ravel()), len(FEATURES))
+    return {
+        "json": (JSON, json.dumps({"records": records}).encode()),
+        "msgpack": (MSGPACK, msgpack.packb({field: columns[field].tolist() for field in FRONTEND_FIELDS})),
+        "arrow (columns)": (ARROW_STREAM, arrow_bytes(pa.RecordBatch.from_pydict({f: columns[f] for f in FRONTEND_FIELDS}))),
+        "arrow (features)": (ARROW_STREAM, arrow_bytes(pa.RecordBatch.from_arrays([features_column], names=["features"]))),
+    }
+
+def best_of(fn, *args):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+ENCODERS = {
+    "json": lambda p: json.dumps({"predictions": encode_json(p)}).encode(),
+    "msgpack": encode_msgpack,
+    "arrow (columns)": encode_arrow,
+    "arrow (features)": encode_arrow,
+}
+
+def run(row_counts):
+    backend = create_backend()
+    print("🧪 Batch payload benchmark (best of 3, milliseconds)")
+    print("=" * 80)
+    for n_rows in row_counts:
+        columns, model_features = frontend_columns(n_rows)
+        score_ms, probabilities = best_of(backend.predict_proba, model_features)
+        print(f"\n{n_rows:,} rows (scoring: {score_ms:.1f} ms)")
+        print(f"  {'format':<17} {'request KB':>11} {'decode':>9} {'encode':>9} {'response KB':>12} {'total':>9}")
+        for name, (content_type, body) in request_bodies(columns, model_features).items():
+            decode_ms, features = best_of(decode_batch_request, content_type, body)
+            encode_ms, response = best_of(ENCODERS[name], probabilities)
+            assert np.allclose(features, model_features), f"{name} decoded different features"
+            print(f"  {name:<17} {len(body) / 1024:>11,.0f} {decode_ms:>9.1f} {encode_ms:>9.1f} "
+                  f"{len(response) / 1024:>12,.0f} {decode_ms + score_ms + encode_ms:>9.1f}")
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    run(counts)
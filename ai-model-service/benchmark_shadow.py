@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark primary /predict latency with shadow evaluation off and on.
+
+Starts a local uvicorn instance for each configuration, drives the same
+request sequence against it and compares latency percentiles. The shadow
+candidate defaults to the primary model so both runs do identical work on
+the request path. Per-tenant rate limits are lifted so the comparison
+measures the request path rather than the token bucket.
+
+Usage: python benchmark_shadow.py [--requests 2000] [--concurrency 8] [--candidate PATH]
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import threading
+import requests
+import numpy as np
+
+from test_patients import test_patients, convert_to_api_format
+
+# Admission limits high enough that a TENANT_RATE in the environment never throttles the benchmark
+UNTHROTTLED_ENV = {"TENANT_RATE": "1000000", "TENANT_BURST": "1000000", "TENANT_MAX_QUEUE_ROWS": "1000000"}
+
+def start_server(port, extra_env):
+    env = dict(os.environ, **UNTHROTTLED_ENV, **extra_env)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(120):
+        try:
+            if requests.get(f"{url}/ready", timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("Server did not become ready")
+
+def drive(url, total, concurrency):
+    """Send `total` requests from `concurrency` clients and return latencies in ms"""
+    payloads = [convert_to_api_format(patient) for patient in test_patients]
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        session = requests.Session()
+        for i in counter:
+            start = time.perf_counter()
+            session.post(f"{url}/predict", json=payloads[i % len(payloads)], timeout=30).raise_for_status()
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies)
+
+def run(label, port, extra_env, args):
+    process, url = start_server(port, extra_env)
+    try:
+        drive(url, 200, args.concurrency)  # warm up
+        latencies = drive(url, args.requests, args.concurrency)
+        shadow_stats = requests.get(f"{url}/shadow/stats", timeout=10).json()
+    finally:
+        process.terminate()
+        process.wait()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"\n{label}")
+    print(f"  /predict latency: p50 {p50:.2f} ms | p95 {p95:.2f} ms | p99 {p99:.2f} ms | mean {latencies.mean():.2f} ms")
+    if shadow_stats.get("enabled"):
+        print(f"  Shadow compared {shadow_stats['compared']} (dropped {shadow_stats['dropped']}), "
+              f"disagreement rate {shadow_stats['disagreement_rate'] * 100:.1f}%")
+    return p50, p95, p99
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--candidate", default=os.getenv("MODEL_PATH", "maternal_health_risk_model_complete.pkl"))
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print("🧪 Shadow evaluation latency benchmark")
+    print("=" * 80)
+    off = run("Shadow off", args.port, {"SHADOW_MODEL_PATH": ""}, args)
+    on = run(f"Shadow on ({args.candidate})", args.port, {"SHADOW_MODEL_PATH": args.candidate}, args)
+
+    print("\n📊 Shadow on vs off:")
+    for name, before, after in zip(["p50", "p95", "p99"], off, on):
+        print(f"  {name}: {before:.2f} ms -> {after:.2f} ms ({after - before:+.2f} ms)")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Parity check and throughput benchmark for the clinical-rule triage stage.
+
+On a synthetic test corpus (a different seed from training) this reports:
+- how many rows the rules resolve at each TRIAGE_MIN_SCORE
+- whether the model agrees with the rule decision on those rows
+- throughput of model-only scoring against triage + model on the rest
+
+Usage: python benchmark_triage.py [--rows N] [--min-score S] [--min-agreement A]
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+
+from inference_backends import FEATURES, RISK_LEVELS, create_backend
+from clinical_rules import DEFAULT_MIN_SCORE, HIGH_RISK_INDEX, HIGH_RISK_SCORE, risk_scores, rule_probabilities
+from retrain_model import create_synthetic_data
+
+BATCH_SIZES = [1, 64, 1024]
+
+def triaged_proba(backend, X, min_score):
+    """The serving triage path without the scheduler"""
+    rule_based = risk_scores(X) >= min_score
+    probabilities = rule_probabilities(len(X))
+    model_rows = ~rule_based
+    if model_rows.any():
+        probabilities[model_rows] = backend.predict_proba(X[model_rows])
+    return probabilities
+
+def measure_throughput(score, X, batch_size):
+    """Rows per second when scoring in batches of batch_size"""
+    repeats = max(1, 4096 // batch_size)
+    batches = [np.take(X, np.arange(i * batch_size, (i + 1) * batch_size), axis=0, mode="wrap") for i in range(repeats)]
+    start = time.perf_counter()
+    for batch in batches:
+        score(batch)
+    return batch_size * repeats / (time.perf_counter() - start)
+
+def run_benchmark(rows, min_score, min_agreement):
+    backend = create_backend()
+    backend.warmup()
+    X = create_synthetic_data(n_samples=rows, seed=7)[FEATURES].to_numpy(dtype=np.float64)
+    scores = risk_scores(X)
+    model_labels = backend.predict_proba(X).argmax(axis=1)
+
+    print("🩺 Clinical-rule triage parity and benchmark")
+    print("=" * 80)
+    print(f"Model: {backend.name} ({backend.model_path}), corpus: {rows} rows")
+
+    print("\n📋 Rule decisions against the model (rows the rules would resolve):")
+    print(f"  {'min score':>9} {'resolved':>10} {'share':>8} {'model agrees':>13}")
+    passed = True
+    disagreements = np.array([], dtype=np.int64)
+    for threshold in range(HIGH_RISK_SCORE, int(scores.max()) + 1):
+        resolved = scores >= threshold
+        n_resolved = int(resolved.sum())
+        agreement = float(np.mean(model_labels[resolved] == HIGH_RISK_INDEX)) if n_resolved else 1.0
+        marker = " <- configured" if threshold == min_score else ""
+        print(f"  {threshold:>9} {n_resolved:>10} {n_resolved / rows * 100:>7.1f}% {agreement * 100:>12.2f}%{marker}")
+        if threshold == min_score:
+            passed = agreement >= min_agreement
+            disagreements = np.flatnonzero(resolved & (model_labels != HIGH_RISK_INDEX))
+
+    if disagreements.size:
+        print(f"\n⚠️  {disagreements.size} resolved rows the model does not call high risk, e.g.:")
+        for i in disagreements[:5]:
+            print(f"  {dict(zip(FEATURES, X[i].round(1)))} score={scores[i]} model={RISK_LEVELS[model_labels[i]]}")
+
+    print(f"\n⚡ Throughput at min score {min_score} (rows/s):")
+    print(f"  {'batch':>6} {'model only':>14} {'triage':>14} {'gain':>7}")
+    for batch_size in BATCH_SIZES:
+        model_only = measure_throughput(backend.predict_proba, X, batch_size)
+        triaged = measure_throughput(lambda batch: triaged_proba(backend, batch, min_score), X, batch_size)
+        print(f"  {batch_size:>6} {model_only:>14,.0f} {triaged:>14,.0f} {triaged / model_only:>6.2f}x")
+
+    print(f"\n{'✅' if passed else '❌'} Model agreement on triaged rows {'meets' if passed else 'is below'} {min_agreement * 100:.1f}%")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--min-score", type=int, default=DEFAULT_MIN_SCORE)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.rows, args.min_score, args.min_agreement) else 1)
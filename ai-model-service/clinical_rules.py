@@ -0,0 +1,122 @@
+"""
+Vectorized clinical scoring rules and the optional triage stage.
+
+risk_scores() is the rule set used to label the synthetic training data in
+retrain_model.py, evaluated over an (N, 6) array in model units (FEATURES
+order). Triage answers rows whose rule score is at least TRIAGE_MIN_SCORE
+with a rule-based high-risk result and leaves the rest to the model.
+
+The default of 6 is the lowest threshold that passes the 99% model
+agreement gate in benchmark_triage.py (99.55%; 5 gives 93.87%). Rows
+scoring 4 or 5 still go to the model, including high blood pressure with
+high blood sugar alone (SBP >= 140 and BS >= 11 score 4). The same
+benchmark measured triage below model-only throughput at every batch size,
+so the stage stays off unless TRIAGE_ENABLED is set.
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+
+from inference_backends import RISK_LEVELS
+
+HIGH_RISK_SCORE = 4
+MID_RISK_SCORE = 2
+HIGH_RISK_INDEX = RISK_LEVELS.index('high risk')
+
+# Lowest TRIAGE_MIN_SCORE passing the benchmark_triage.py parity gate
+DEFAULT_MIN_SCORE = 6
+
+
+def risk_scores(features):
+    """Clinical risk score for each row of an (N, 6) model-unit array"""
+    age, systolic, diastolic, blood_sugar, body_temp, heart_rate = np.asarray(features, dtype=np.float64).T
+    scores = ((age < 18) | (age > 35)).astype(np.int64)
+
+    high_bp = (systolic >= 140) | (diastolic >= 90)
+    low_bp = (systolic < 90) | (diastolic < 60)
+    scores += np.where(high_bp, 2, np.where(low_bp, 1, 0))
+
+    scores += np.where(blood_sugar >= 11, 2, np.where(blood_sugar < 4, 1, 0))
+    scores += (body_temp >= 100.4) | (body_temp < 96)
+    scores += (heart_rate > 100) | (heart_rate < 60)
+    return scores
+
+
+def rule_risk_levels(features):
+    """Rule-based risk level index (into RISK_LEVELS) for each row"""
+    scores = risk_scores(features)
+    return np.where(scores >= HIGH_RISK_SCORE, 2, np.where(scores >= MID_RISK_SCORE, 1, 0))
+
+
+def rule_probabilities(n_rows):
+    """Probabilities reported for rule-resolved rows: certain high risk"""
+    probabilities = np.zeros((n_rows, len(RISK_LEVELS)))
+    probabilities[:, HIGH_RISK_INDEX] = 1.0
+    return probabilities
+
+
+class Triage:
+    """Resolves high-scoring rows by rule and tracks how much traffic it absorbs"""
+
+    def __init__(self, min_score=DEFAULT_MIN_SCORE):
+        self.min_score = min_score
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.resolved_requests = 0
+        self.rows = 0
+        self.resolved_rows = 0
+        self.triage_seconds = 0.0
+        self.model_rows = 0
+        self.model_seconds = 0.0
+
+    def resolve(self, features):
+        """Boolean mask of the rows the rules decide; the others need the model"""
+        start = time.perf_counter()
+        resolved = risk_scores(features) >= self.min_score
+        elapsed = time.perf_counter() - start
+        n_resolved = int(resolved.sum())
+        with self.lock:
+            self.requests += 1
+            self.resolved_requests += n_resolved == len(features)
+            self.rows += len(features)
+            self.resolved_rows += n_resolved
+            self.triage_seconds += elapsed
+        return resolved
+
+    def record_model(self, rows, seconds):
+        """Account for rows that went to the model and its service time for them, excluding queueing"""
+        with self.lock:
+            self.model_rows += rows
+            self.model_seconds += seconds
+
+    def stats(self):
+        with self.lock:
+            model_seconds_per_row = self.model_seconds / self.model_rows if self.model_rows else None
+            # Time the model would have spent on every row, against what was actually spent
+            saved_seconds = model_seconds_per_row * self.resolved_rows if model_seconds_per_row else 0.0
+            spent_seconds = self.model_seconds + self.triage_seconds
+            return {
+                "enabled": True,
+                "min_score": self.min_score,
+                "requests": self.requests,
+                "resolved_requests": self.resolved_requests,
+                "resolved_request_share": self.resolved_requests / self.requests if self.requests else 0.0,
+                "rows": self.rows,
+                "resolved_rows": self.resolved_rows,
+                "resolved_row_share": self.resolved_rows / self.rows if self.rows else 0.0,
+                "triage_seconds": self.triage_seconds,
+                "model_rows": self.model_rows,
+                "model_seconds": self.model_seconds,
+                "estimated_seconds_saved": saved_seconds,
+                "estimated_throughput_gain": (spent_seconds + saved_seconds) / spent_seconds if spent_seconds else 1.0,
+            }
+
+
+def create_triage():
+    """Create the triage stage if TRIAGE_ENABLED is set, otherwise None"""
+    if os.getenv("TRIAGE_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return None
+    return Triage(min_score=int(os.getenv("TRIAGE_MIN_SCORE", str(DEFAULT_MIN_SCORE))))
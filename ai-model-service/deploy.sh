@@ -8,6 +8,8 @@ IMAGE_NAME="iyacare-ai-service"
 CONTAINER_NAME="iyacare-ai-container"
 PORT=8000
 MODEL_PATH="./models"
+HEALTHCHECK_PATH="${HEALTHCHECK_PATH:-/ready}"
+READY_TIMEOUT="${READY_TIMEOUT:-120}"
 
 # Create models directory if it doesn't exist
 mkdir -p models
@@ -31,13 +33,18 @@ docker run -d \
   --restart unless-stopped \
   $IMAGE_NAME
 
-# Wait for service to be ready
-echo "⏳ Waiting for service to be ready..."
-sleep 10
+# Wait for service to be ready (model loaded and warmed up)
+echo "⏳ Waiting for $HEALTHCHECK_PATH (up to ${READY_TIMEOUT}s)..."
+for i in $(seq 1 $READY_TIMEOUT); do
+  if curl -sf http://localhost:$PORT$HEALTHCHECK_PATH > /dev/null; then
+    break
+  fi
+  sleep 1
+done
 
 # Health check
-echo "🔍 Performing health check..."
-if curl -f http://localhost:$PORT/health; then
+echo "🔍 Performing readiness check..."
+if curl -f http://localhost:$PORT$HEALTHCHECK_PATH; then
   echo "✅ AI Service deployed successfully!"
   echo "🌐 Service available at: http://localhost:$PORT"
   echo "📚 API Documentation: http://localhost:$PORT/docs"
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Script to export the complete maternal health risk model to ONNX for the onnx inference backend
+"""
+
+import os
+import sys
+
+from inference_backends import DEFAULT_MODEL_PATH, DEFAULT_ONNX_MODEL_PATH, export_onnx, scaler_sidecar_path
+
+if __name__ == "__main__":
+    model_path = sys.argv[1] if len(sys.argv) > 1 else os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+    onnx_path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("ONNX_MODEL_PATH", DEFAULT_ONNX_MODEL_PATH)
+
+    print(f"🔄 Exporting {model_path} to ONNX...")
+    export_onnx(model_path, onnx_path)
+    print(f"✅ ONNX model saved to {onnx_path}")
+    print(f"✅ Scaler parameters saved to {scaler_sidecar_path(onnx_path)}")
+    print("📁 Start the service with INFERENCE_BACKEND=onnx to serve it.")
@@ -0,0 +1,267 @@
+"""
+Inference backends for the maternal health risk model.
+
+Every backend scores an (N, 6) float array of features in model units
+(Age, SystolicBP, DiastolicBP, BS in mmol/L, BodyTemp in °F, HeartRate)
+and returns an (N, 3) array of class probabilities ordered as RISK_LEVELS.
+"""
+
+import os
+import time
+import logging
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
+RISK_LEVELS = ['low risk', 'mid risk', 'high risk']
+
+DEFAULT_MODEL_PATH = "maternal_health_risk_model_complete.pkl"
+LEGACY_MODEL_PATH = "maternal_risk_xgboost.pkl"
+DEFAULT_ONNX_MODEL_PATH = "maternal_health_risk_model_complete.onnx"
+
+# Representative patient in model units, used for warm-up inferences
+WARMUP_ROW = np.array([[28.0, 120.0, 80.0, 6.0, 98.6, 75.0]])
+
+
+# Medical (min, max) ranges used by legacy models, in FEATURES order
+LEGACY_RANGES = np.array([
+    (15, 85),      # Age
+    (80, 200),     # SystolicBP
+    (50, 120),     # DiastolicBP
+    (3.0, 15.0),   # BS, mmol/L range
+    (95, 105),     # BodyTemp, Fahrenheit range
+    (40, 150),     # HeartRate
+], dtype=np.float64)
+
+
+def normalize_features_medical(features):
+    """
+    Fallback medical normalization for legacy model compatibility: scales
+    every row of an (N, 6) array to [-1, 1] over the medical ranges
+    """
+    features = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURES))
+    min_val, max_val = LEGACY_RANGES[:, 0], LEGACY_RANGES[:, 1]
+    return np.clip(2 * (features - min_val) / (max_val - min_val) - 1, -1, 1)
+
+
+class InferenceBackend:
+    """Base class for all inference backends"""
+
+    name = "base"
+    model_type = "unknown"
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.load_seconds = None
+
+    def load(self):
+        """Load the model artifact into memory"""
+        raise NotImplementedError
+
+    def predict_proba(self, X):
+        """Return class probabilities for an (N, 6) array in model units"""
+        raise NotImplementedError
+
+    def warmup(self, batch_sizes=(1, 64)):
+        """Run representative inferences and return latency in ms per batch size"""
+        timings = {}
+        for batch_size in batch_sizes:
+            X = np.repeat(WARMUP_ROW, batch_size, axis=0)
+            start = time.perf_counter()
+            self.predict_proba(X)
+            timings[batch_size] = (time.perf_counter() - start) * 1000
+        return timings
+
+    def model_bytes(self):
+        """Serialized size of the loaded model; a lower bound on its resident memory"""
+        return os.path.getsize(self.model_path) if self.model_path else 0
+
+    def describe(self):
+        """Describe the loaded backend for health and admin endpoints"""
+        return {
+            "backend": self.name,
+            "model_type": self.model_type,
+            "model_path": self.model_path,
+            "features": FEATURES,
+            "risk_levels": RISK_LEVELS,
+            "load_seconds": self.load_seconds,
+        }
+
+
+class XGBoostBackend(InferenceBackend):
+    """Complete MaternalRiskPredictor pickle: StandardScaler + XGBClassifier"""
+
+    name = "xgboost"
+    model_type = "complete"
+
+    def __init__(self, model_path, predictor=None):
+        super().__init__(model_path)
+        self.predictor = predictor
+        self.mean = None
+        self.scale = None
+
+    def load(self):
+        start = time.perf_counter()
+        if self.predictor is None:
+            self.predictor = joblib.load(self.model_path)
+        if not hasattr(self.predictor, 'predict_risk'):
+            raise ValueError(f"{self.model_path} is not a complete MaternalRiskPredictor model")
+        if not self.predictor.is_fitted:
+            raise ValueError("Model has not been fitted yet. Please train the model first.")
+
+        # Apply the fitted StandardScaler directly on arrays; this is what
+        # scaler.transform() computes, minus the DataFrame feature-name checks.
+        scaler = self.predictor.scaler
+        self.mean = scaler.mean_ if scaler.with_mean else 0.0
+        self.scale = scaler.scale_ if scaler.with_std else 1.0
+        self.load_seconds = time.perf_counter() - start
+        return self
+
+    def predict_proba(self, X):
+        X_scaled = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return self.predictor.model.predict_proba(X_scaled)
+
+    def model_bytes(self):
+        return len(self.predictor.model.get_booster().save_raw()) + np.asarray(self.mean).nbytes * 2
+
+
+class LegacyBackend(InferenceBackend):
+    """Bare XGBClassifier pickle scored with medical min/max normalization"""
+
+    name = "legacy"
+    model_type = "legacy"
+
+    def __init__(self, model_path, model=None):
+        super().__init__(model_path)
+        self.model = model
+
+    def load(self):
+        start = time.perf_counter()
+        if self.model is None:
+            self.model = joblib.load(self.model_path)
+        self.load_seconds = time.perf_counter() - start
+        return self
+
+    def model_bytes(self):
+        return len(self.model.get_booster().save_raw())
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(normalize_features_medical(X))
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX export of the complete model running on ONNX Runtime's CPU provider"""
+
+    name = "onnx"
+    model_type = "complete"
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        self.session = None
+        self.input_name = None
+        self.mean = None
+        self.scale = None
+
+    def load(self):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("The onnx backend requires the onnxruntime package") from e
+
+        start = time.perf_counter()
+        options = ort.SessionOptions()
+        threads = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+        scaler = np.load(scaler_sidecar_path(self.model_path))
+        self.mean = scaler["mean"]
+        self.scale = scaler["scale"]
+        self.load_seconds = time.perf_counter() - start
+        return self
+
+    def predict_proba(self, X):
+        X_scaled = ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+        outputs = self.session.run(None, {self.input_name: X_scaled})
+        probabilities = outputs[-1]
+        if isinstance(probabilities, list):
+            # ZipMap output: one {class_index: probability} dict per row
+            probabilities = np.array([[row[i] for i in range(len(RISK_LEVELS))] for row in probabilities])
+        return np.asarray(probabilities, dtype=np.float64)
+
+    def describe(self):
+        info = super().describe()
+        info["providers"] = self.session.get_providers() if self.session is not None else []
+        return info
+
+
+def scaler_sidecar_path(onnx_path):
+    """Path of the .npz file holding the scaler parameters for an ONNX model"""
+    return os.path.splitext(onnx_path)[0] + ".scaler.npz"
+
+
+def resolve_model_path(model_path=None):
+    """Resolve the pickled model path, falling back to the legacy artifact"""
+    model_path = model_path or os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+    if not os.path.exists(model_path):
+        logger.error(f"Complete model file not found at {model_path}")
+        # Fallback to old model path for backward compatibility
+        model_path = LEGACY_MODEL_PATH
+        if not os.path.exists(model_path):
+            raise FileNotFoundError("No model file found")
+    return model_path
+
+
+def create_backend(name=None, model_path=None):
+    """
+    Create and load the inference backend selected by name or by the
+    INFERENCE_BACKEND environment variable ("xgboost", "legacy" or "onnx").
+    Pickles without predict_risk are served by the legacy backend.
+    """
+    name = (name or os.getenv("INFERENCE_BACKEND", "xgboost")).lower()
+
+    if name == "onnx":
+        backend = OnnxBackend(model_path or os.getenv("ONNX_MODEL_PATH", DEFAULT_ONNX_MODEL_PATH))
+    elif name == "xgboost":
+        model_path = resolve_model_path(model_path)
+        model = joblib.load(model_path)
+        if hasattr(model, 'predict_risk'):
+            backend = XGBoostBackend(model_path, model)
+        else:
+            backend = LegacyBackend(model_path, model)
+    elif name == "legacy":
+        backend = LegacyBackend(model_path or LEGACY_MODEL_PATH)
+    else:
+        raise ValueError(f"Unknown inference backend: {name}")
+
+    return backend.load()
+
+
+def export_onnx(model_path=DEFAULT_MODEL_PATH, onnx_path=DEFAULT_ONNX_MODEL_PATH):
+    """Export the booster of a complete model to ONNX plus a scaler sidecar"""
+    try:
+        from onnxmltools import convert_xgboost
+        from onnxmltools.convert.common.data_types import FloatTensorType
+    except ImportError as e:
+        raise RuntimeError("ONNX export requires the onnxmltools package") from e
+
+    backend = XGBoostBackend(model_path).load()
+    onnx_model = convert_xgboost(
+        backend.predictor.model,
+        initial_types=[("input", FloatTensorType([None, len(FEATURES)]))],
+    )
+    with open(onnx_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+    np.savez(
+        scaler_sidecar_path(onnx_path),
+        mean=np.broadcast_to(backend.mean, (len(FEATURES),)).astype(np.float64),
+        scale=np.broadcast_to(backend.scale, (len(FEATURES),)).astype(np.float64),
+    )
+    return onnx_path
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant load test for the admission control and fair scheduling in main.py.
+
+Each tenant runs a number of concurrent clients posting to /predict with its
+X-Tenant-ID and, optionally, an X-Deadline-Ms budget. The default scenario
+pits a bulk sync flooding the service against a latency-sensitive monitor.
+Per-tenant rate limiting is opt-in; start the service with TENANT_RATE
+(and TENANT_BURST) set to exercise it.
+
+Usage:
+  python load_test_tenants.py --url http://localhost:8000 --duration 20 \\
+      --tenant bulk-sync:32 --tenant live-monitoring:2:250
+"""
+
+import time
+import argparse
+import threading
+import requests
+import numpy as np
+
+from test_patients import test_patients, convert_to_api_format
+
+def run_client(url, tenant, deadline_ms, stop_at, results, lock):
+    """Post patients in a loop until stop_at and record (status, latency)"""
+    session = requests.Session()
+    headers = {"X-Tenant-ID": tenant}
+    if deadline_ms:
+        headers["X-Deadline-Ms"] = str(deadline_ms)
+    payloads = [convert_to_api_format(patient) for patient in test_patients]
+
+    i = 0
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            status = session.post(f"{url}/predict", json=payloads[i % len(payloads)], headers=headers, timeout=30).status_code
+        except requests.RequestException:
+            status = 0
+        latency = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((status, latency))
+        i += 1
+
+def parse_tenant(spec):
+    """name:concurrency[:deadline_ms]"""
+    parts = spec.split(":")
+    return parts[0], int(parts[1]), float(parts[2]) if len(parts) > 2 else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--tenant", action="append", dest="tenants")
+    args = parser.parse_args()
+    tenants = [parse_tenant(spec) for spec in (args.tenants or ["bulk-sync:32", "live-monitoring:2:250"])]
+
+    print(f"🚦 Multi-tenant load test against {args.url} for {args.duration:.0f}s")
+    print("=" * 80)
+
+    stop_at = time.time() + args.duration
+    lock = threading.Lock()
+    results = {name: [] for name, _, _ in tenants}
+    threads = []
+    for name, concurrency, deadline_ms in tenants:
+        for _ in range(concurrency):
+            thread = threading.Thread(target=run_client, args=(args.url, name, deadline_ms, stop_at, results[name], lock))
+            thread.start()
+            threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    for name, concurrency, deadline_ms in tenants:
+        statuses = np.array([status for status, _ in results[name]])
+        ok_latencies = [latency for status, latency in results[name] if status == 200]
+        p50, p95, p99 = np.percentile(ok_latencies, [50, 95, 99]) if ok_latencies else (0, 0, 0)
+        print(f"\n{name} (clients={concurrency}, deadline={deadline_ms or '-'} ms)")
+        print(f"  Requests: {len(statuses)} | 200: {(statuses == 200).sum()} | 429: {(statuses == 429).sum()} | 504: {(statuses == 504).sum()} | other: {(~np.isin(statuses, [200, 429, 504])).sum()}")
+        print(f"  Throughput: {(statuses == 200).sum() / args.duration:.1f} req/s")
+        print(f"  Latency (200 only): p50 {p50:.1f} ms | p95 {p95:.1f} ms | p99 {p99:.1f} ms")
+
+    stats = requests.get(f"{args.url}/admission/stats", timeout=10).json()
+    print(f"\n📊 Server-side scheduler stats (mean micro-batch {stats['mean_batch_rows']:.1f} rows)")
+    for name, tenant_stats in stats["tenants"].items():
+        wait = tenant_stats["queue_wait_ms"]
+        print(f"  {name}: served {tenant_stats['served_requests']}, shed expired {tenant_stats['shed_expired']}, "
+              f"rejected {tenant_stats['shed_rejected']}, queue wait p50 {wait['p50']:.1f} ms / p95 {wait['p95']:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
+import io
 import os
+import json
+import hmac
+import time
+import asyncio
 import logging
-import joblib
 import numpy as np
 import pandas as pd
+from contextlib import nullcontext
 from datetime import datetime
-from fastapi import FastAPI, HTTPException
+from typing import List, Optional
+from fastapi import BackgroundTasks, Depends, FastAPI, File, Header, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
@@ -16,6 +24,18 @@ from imblearn.over_sampling import SMOTE
 
 # Import the MaternalRiskPredictor class from separate module
 from maternal_risk_predictor import MaternalRiskPredictor
+from inference_backends import RISK_LEVELS, create_backend
+from batch_jobs import create_job_runner
+from admission import DEFAULT_TENANT, DeadlineExceeded, QueueFull, create_scheduler
+from shadow import create_shadow_evaluator
+from model_registry import ModelNotFound, create_model_registry
+from clinical_rules import create_triage, rule_probabilities
+from traffic_capture import create_traffic_recorder
+from payload_codecs import (
+    ARROW_FILE, ARROW_STREAM, FRONTEND_FIELDS, JSON, MSGPACK, NDJSON, STREAM_TYPES, StreamDecoder, StreamEncoder,
+    UnsupportedMediaType, convert_frontend_array, decode_batch, encode_batch, media_type, negotiate
+)
+from profiling import MAX_PROFILE_SECONDS, RequestProfiler, StackSampler, profile_event_loop, profiling_enabled
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +52,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand profiling; nothing is installed unless PROFILING_ENABLED is set
+request_profiler = None
+profile_session_active = False
+
+if profiling_enabled():
+    request_profiler = RequestProfiler(fraction=float(os.getenv("PROFILE_REQUEST_FRACTION", "0")))
+
+    @app.middleware("http")
+    async def profile_sampled_requests(request: Request, call_next):
+        """Sample thread stacks while a configured fraction of /predict requests run"""
+        if request.url.path != "/predict" or not request_profiler.should_profile():
+            return await call_next(request)
+        with request_profiler.profiling():
+            return await call_next(request)
+
 # Request/Response models
 class PredictionRequest(BaseModel):
     age: float
@@ -40,6 +75,7 @@ class PredictionRequest(BaseModel):
     blood_sugar: float  # This will be in mg/dL from frontend
     body_temp: float    # This will be in Celsius from frontend
     heart_rate: float
+    model_id: Optional[str] = None  # Model variant from MODEL_DIR; defaults to the primary model
 
 class PredictionResponse(BaseModel):
     risk_level: str  # Changed from predicted_risk
@@ -47,67 +83,199 @@ class PredictionResponse(BaseModel):
     probabilities: dict  # Changed from probability_distribution
     score: int = 0  # Added score field that frontend expects
     timestamp: str = ""  # Added timestamp field
+    source: str = "model"  # "clinical_rules" when the triage stage answered without the model
+
+class BatchPredictionRequest(BaseModel):
+    records: List[PredictionRequest]
+
+# Rows per scheduler submission for batch and streaming requests
+BATCH_CHUNK_ROWS = int(os.getenv("BATCH_CHUNK_ROWS", "4096"))
+
+# Bytes of a /predict/stream body decoded and scored per step
+STREAM_FEED_BYTES = int(os.getenv("STREAM_FEED_BYTES", str(1024 * 1024)))
+
+# Global variable to store the loaded inference backend
+backend = None
+
+# Background runner for asynchronous batch scoring jobs
+job_runner = None
+
+# Per-tenant fair scheduler for interactive inference
+scheduler = None
+
+# Candidate model scored in the background on live traffic (SHADOW_MODEL_PATH)
+shadow = None
+
+# Lazily loaded model variants selected per request (MODEL_DIR)
+model_registry = create_model_registry()
 
-# Global variable to store the loaded model
-predictor = None
+# Clinical-rule pre-filter for high-scoring inputs, off unless TRIAGE_ENABLED is set
+triage = create_triage()
+
+# Sampled /predict inputs recorded for offline replay (CAPTURE_DIR)
+traffic_recorder = None
+
+# Warm-up progress; /ready reports not ready until every step has run
+warmup_state = {"ready": False, "started_at": None, "finished_at": None, "attempts": 0, "steps": [], "error": None}
+
+# Reference to the background warm-up task so it is not garbage-collected mid-run
+warmup_task = None
+
+# Representative request used to warm the full request path
+WARMUP_REQUEST = PredictionRequest(
+    age=28, systolic_bp=120, diastolic_bp=80, blood_sugar=108, body_temp=37.0, heart_rate=75
+)
 
 def load_model():
-    """Load your new complete XGBoost model"""
-    global predictor
+    """Load the inference backend selected by INFERENCE_BACKEND"""
+    global backend
     try:
-        # Try to load the complete model first
-        model_path = os.getenv("MODEL_PATH", "maternal_health_risk_model_complete.pkl")
-        if not os.path.exists(model_path):
-            logger.error(f"Complete model file not found at {model_path}")
-            # Fallback to old model path for backward compatibility
-            model_path = "maternal_risk_xgboost.pkl"
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"No model file found")
-        
-        predictor = joblib.load(model_path)
-        logger.info(f"Model loaded successfully from {model_path}")
+        backend = create_backend()
+        info = backend.describe()
+        logger.info(f"Model loaded successfully from {info['model_path']} using the {info['backend']} backend")
         
-        # Check if it's the new complete model format
-        if hasattr(predictor, 'predict_risk'):
-            logger.info("✅ New complete model format detected!")
-            logger.info(f"Features: {predictor.features}")
-            logger.info(f"Risk levels: {predictor.risk_levels}")
-        else:
+        if info['model_type'] == "legacy":
             logger.info("⚠️  Old model format detected - will use compatibility mode")
+        else:
+            logger.info("✅ New complete model format detected!")
+            logger.info(f"Features: {info['features']}")
+            logger.info(f"Risk levels: {info['risk_levels']}")
         
     except Exception as e:
         logger.error(f"Failed to load model: {str(e)}")
         raise e
 
-def convert_frontend_to_model_format(request: PredictionRequest):
+def features_from_requests(requests):
     """
-    Convert frontend data format to the model's expected format
-    Frontend -> Model conversions:
-    - blood_sugar: mg/dL -> mmol/L (divide by 18.0)
-    - body_temp: Celsius -> Fahrenheit (C * 9/5 + 32)
+    Build the (N, 6) model-unit feature array for a list of requests
+    (blood sugar mg/dL -> mmol/L, body temperature Celsius -> Fahrenheit)
     """
-    # Convert blood sugar from mg/dL to mmol/L
-    bs_mmol = request.blood_sugar / 18.0
+    features = np.array([
+        [r.age, r.systolic_bp, r.diastolic_bp, r.blood_sugar, r.body_temp, r.heart_rate]
+        for r in requests
+    ], dtype=np.float64).reshape(-1, len(FRONTEND_FIELDS))
+    return convert_frontend_array(features)
+
+def parse_batch_file(filename: str, content: bytes):
+    """Parse an uploaded CSV, JSON, MessagePack or Arrow batch file into model-unit features"""
+    if filename.lower().endswith(".msgpack"):
+        return decode_batch(MSGPACK, content)
+    if filename.lower().endswith((".arrow", ".arrows", ".feather")):
+        return decode_batch(ARROW_STREAM, content)
+    if filename.lower().endswith(".json"):
+        df = pd.DataFrame(json.loads(content))
+    else:
+        df = pd.read_csv(io.BytesIO(content))
     
-    # Convert body temperature from Celsius to Fahrenheit  
-    temp_fahrenheit = (request.body_temp * 9/5) + 32
+    missing_fields = set(FRONTEND_FIELDS) - set(df.columns)
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {sorted(missing_fields)}")
     
-    model_data = {
-        'Age': request.age,
-        'SystolicBP': request.systolic_bp,
-        'DiastolicBP': request.diastolic_bp,
-        'BS': bs_mmol,  # Now in mmol/L
-        'BodyTemp': temp_fahrenheit,  # Now in Fahrenheit
-        'HeartRate': request.heart_rate
+    features = df[FRONTEND_FIELDS].to_numpy(dtype=np.float64)
+    if np.isnan(features).any():
+        raise ValueError("Batch file contains missing values")
+    return convert_frontend_array(features)
+
+def build_prediction(probabilities) -> dict:
+    """Turn one row of class probabilities into the response fields"""
+    predicted_index = int(np.argmax(probabilities))
+    predicted_risk_text = RISK_LEVELS[predicted_index]
+    return {
+        "risk_level": predicted_risk_text,
+        "confidence": float(probabilities[predicted_index]),
+        "probabilities": {RISK_LEVELS[i]: float(probabilities[i]) for i in range(len(RISK_LEVELS))},
+        "score": get_risk_score(predicted_risk_text),
     }
-    
-    logger.info(f"Converted data: {model_data}")
-    return model_data
 
 @app.on_event("startup")
 async def startup_event():
-    """Load the model when the app starts"""
+    """Load the model and start the scheduler and batch job workers when the app starts"""
+    global job_runner, scheduler, shadow, traffic_recorder, warmup_task
     load_model()
+    shadow = create_shadow_evaluator()
+    if shadow is not None:
+        shadow.start()
+    scheduler = create_scheduler(lambda: backend)
+    scheduler.start()
+    job_runner = create_job_runner(lambda: backend)
+    job_runner.start()
+    traffic_recorder = create_traffic_recorder()
+    if traffic_recorder is not None:
+        traffic_recorder.start()
+    # Warm up in the background so /health answers while /ready is still false
+    warmup_task = asyncio.get_event_loop().create_task(warm_up())
+
+async def warm_up():
+    """
+    Warm up the service, retrying up to WARMUP_ATTEMPTS times with a growing
+    delay. If every attempt fails, /health reports unhealthy as well so the
+    orchestrator restarts the instance instead of leaving it not-ready.
+    """
+    attempts = int(os.getenv("WARMUP_ATTEMPTS", "3"))
+    warmup_state["started_at"] = datetime.now().isoformat()
+    try:
+        for attempt in range(1, attempts + 1):
+            warmup_state["attempts"] = attempt
+            warmup_state["steps"] = []
+            try:
+                await run_warmup_steps()
+                warmup_state["ready"] = True
+                warmup_state["error"] = None
+                logger.info(f"✅ Warm-up complete: {warmup_state['steps']}")
+                return
+            except Exception as e:
+                warmup_state["error"] = str(e)
+                logger.error(f"Warm-up attempt {attempt}/{attempts} failed: {str(e)}")
+                if attempt < attempts:
+                    await asyncio.sleep(2 ** attempt)
+        logger.critical(f"❌ Warm-up failed after {attempts} attempts; reporting unhealthy")
+    finally:
+        warmup_state["finished_at"] = datetime.now().isoformat()
+
+async def run_warmup_steps():
+    """
+    Run representative single-row and batch inferences on every configured
+    backend, then one request through the scheduler, recording each step
+    """
+    batch_sizes = [int(size) for size in os.getenv("WARMUP_BATCH_SIZES", "1,32,256").split(",")]
+    rounds = int(os.getenv("WARMUP_ROUNDS", "2"))
+    backends = {"primary": backend}
+    if shadow is not None:
+        backends["shadow"] = shadow.candidate
+    
+    for name, warm_backend in backends.items():
+        for round_index in range(rounds):
+            timings = await run_in_threadpool(warm_backend.warmup, batch_sizes)
+            for batch_size, latency_ms in timings.items():
+                warmup_state["steps"].append({
+                    "step": f"{name}:{warm_backend.name}",
+                    "round": round_index,
+                    "batch_size": batch_size,
+                    "latency_ms": latency_ms
+                })
+    
+    for round_index in range(rounds):
+        start = time.perf_counter()
+        features = features_from_requests([WARMUP_REQUEST])
+        build_prediction((await scheduler.submit("warmup", features))[0])
+        warmup_state["steps"].append({
+            "step": "request_path",
+            "round": round_index,
+            "batch_size": 1,
+            "latency_ms": (time.perf_counter() - start) * 1000
+        })
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batch job workers; unfinished jobs resume on next start"""
+    if job_runner is not None:
+        job_runner.stop()
+    if scheduler is not None:
+        await scheduler.stop()
+    if shadow is not None:
+        shadow.stop()
+    if traffic_recorder is not None:
+        traffic_recorder.stop()
 
 @app.get("/")
 async def root():
@@ -116,12 +284,23 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy", 
-        "model_loaded": predictor is not None,
-        "model_type": "complete" if hasattr(predictor, 'predict_risk') else "legacy"
-    }
+    """Liveness check; use /ready to know whether the service can take traffic"""
+    info = backend.describe() if backend is not None else {}
+    # Warm-up gave up: fail liveness so the instance gets restarted
+    warmup_failed = warmup_state["finished_at"] is not None and not warmup_state["ready"]
+    return JSONResponse(status_code=503 if warmup_failed else 200, content={
+        "status": "unhealthy" if warmup_failed else "healthy", 
+        "model_loaded": backend is not None,
+        "model_type": info.get("model_type"),
+        "backend": info.get("backend"),
+        "warmup_error": warmup_state["error"] if warmup_failed else None
+    })
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 200 once the model is loaded and warm-up has finished"""
+    ready = backend is not None and warmup_state["ready"]
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "warmup": warmup_state})
 
 def get_risk_score(risk_level: str) -> int:
     """Convert risk level to numerical score"""
@@ -132,97 +311,381 @@ def get_risk_score(risk_level: str) -> int:
     }
     return score_mapping.get(risk_level, 0)
 
+async def resolve_backend(model_id: Optional[str]):
+    """The primary backend, or the registry's backend for a requested model id"""
+    if not model_id:
+        return backend
+    try:
+        return await run_in_threadpool(model_registry.get, model_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def request_deadline(deadline_ms: Optional[float]) -> Optional[float]:
+    """Turn an X-Deadline-Ms budget into an absolute time.monotonic() deadline"""
+    if deadline_ms is None:
+        return None
+    return time.monotonic() + deadline_ms / 1000
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_risk(request: PredictionRequest):
-    """Make risk prediction using your new complete XGBoost model"""
-    if predictor is None:
+async def predict_risk(
+    request: PredictionRequest,
+    background_tasks: BackgroundTasks,
+    x_tenant_id: Optional[str] = Header(None),
+    x_client_id: Optional[str] = Header(None),
+    x_deadline_ms: Optional[float] = Header(None),
+    x_model_id: Optional[str] = Header(None)
+):
+    """Make risk prediction using the configured inference backend"""
+    tenant = x_tenant_id or x_client_id or DEFAULT_TENANT
+    if traffic_recorder is not None:
+        traffic_recorder.offer([getattr(request, field) for field in FRONTEND_FIELDS], tenant)
+    if backend is None or scheduler is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    deadline = request_deadline(x_deadline_ms)
+    model_id = x_model_id or request.model_id
+    model_backend = await resolve_backend(model_id)
+    
     try:
         logger.info(f"Received prediction request: age={request.age} systolic_bp={request.systolic_bp} diastolic_bp={request.diastolic_bp} blood_sugar={request.blood_sugar} body_temp={request.body_temp} heart_rate={request.heart_rate}")
         
         # Convert frontend data to model format
-        model_data = convert_frontend_to_model_format(request)
+        features = features_from_requests([request])
         
-        # Check if we have the new complete model
-        if hasattr(predictor, 'predict_risk'):
-            # Use the new complete model's predict_risk method
-            result = predictor.predict_risk(model_data)
-            
-            predicted_risk_text = result['risk_level']
-            confidence = result['confidence']
-            prob_dist = result['probabilities']
-            
-            logger.info(f"New model prediction: {predicted_risk_text} with {confidence:.3f} confidence")
-            logger.info(f"Probabilities: {prob_dist}")
-            
-        else:
-            # Fallback to old model format with medical normalization
-            logger.warning("Using legacy model format with medical normalization")
-            
-            # Prepare features array (convert dict to array in correct order)
-            features = np.array([[
-                model_data['Age'],
-                model_data['SystolicBP'], 
-                model_data['DiastolicBP'],
-                model_data['BS'],
-                model_data['BodyTemp'],
-                model_data['HeartRate']
-            ]])
-            
-            # Use medical normalization (from previous fix)
-            features_normalized = normalize_features_medical(features)
-            
-            # Make prediction
-            prediction = predictor.predict(features_normalized)[0]
-            probabilities = predictor.predict_proba(features_normalized)[0]
-            
-            # Map to risk levels
-            risk_mapping = {0: "low risk", 1: "mid risk", 2: "high risk"}
-            predicted_risk_text = risk_mapping.get(int(prediction), "unknown risk")
-            confidence = float(max(probabilities))
-            
-            # Create probability distribution
-            class_names = ["low risk", "mid risk", "high risk"]
-            prob_dist = {class_names[i]: float(probabilities[i]) for i in range(len(class_names))}
+        # Batch job workers back off while interactive requests are in flight
+        with job_runner.interactive() if job_runner is not None else nullcontext():
+            all_probabilities, rule_based = await triaged_scores(features, tenant, deadline, model_backend, bulk=False)
+        probabilities = all_probabilities[0]
+        source = "clinical_rules" if rule_based is not None and rule_based[0] else "model"
+        result = build_prediction(probabilities)
+        
+        logger.info(f"{model_id or model_backend.name} prediction ({source}): {result['risk_level']} with {result['confidence']:.3f} confidence")
+        logger.info(f"Probabilities: {result['probabilities']}")
         
-        # Calculate score and timestamp
-        score = get_risk_score(predicted_risk_text)
-        timestamp = datetime.now().isoformat()
+        # Shadow scoring is queued only after the response has been sent
+        if shadow is not None and model_backend is backend and source == "model":
+            background_tasks.add_task(shadow.offer, features, probabilities)
         
         return PredictionResponse(
-            risk_level=predicted_risk_text,
-            confidence=confidence,
-            probabilities=prob_dist,
-            score=score,
-            timestamp=timestamp
+            **result,
+            timestamp=datetime.now().isoformat(),
+            source=source
         )
         
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Request shed: {str(e)}")
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many queued requests: {str(e)}")
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
-def normalize_features_medical(features):
+async def score_features(features, tenant: str, deadline: Optional[float], model_backend=None, bulk=True,
+                         service_time=None):
     """
-    Fallback medical normalization for legacy model compatibility
+    Score an (N, 6) array through the scheduler. Bulk work is submitted in
+    chunks of at most BATCH_CHUNK_ROWS (and TENANT_BURST when rate limiting
+    is on) rows so it interleaves with other tenants' work. Model time per
+    chunk is appended to the optional `service_time` list
     """
-    ranges = {
-        'age': (15, 85),
-        'systolic_bp': (80, 200),
-        'diastolic_bp': (50, 120),
-        'blood_sugar': (3.0, 15.0),  # mmol/L range
-        'body_temp': (95, 105),      # Fahrenheit range
-        'heart_rate': (40, 150)
-    }
+    chunk_rows = BATCH_CHUNK_ROWS if scheduler.rate is None else max(1, min(BATCH_CHUNK_ROWS, int(scheduler.burst)))
+    if not bulk or len(features) <= chunk_rows:
+        return await scheduler.submit(tenant, features, deadline, model_backend, bulk=bulk, service_time=service_time)
+    parts = []
+    for start in range(0, len(features), chunk_rows):
+        parts.append(await scheduler.submit(
+            tenant, features[start:start + chunk_rows], deadline, model_backend, bulk=True, service_time=service_time
+        ))
+    return np.vstack(parts)
+
+async def triaged_scores(features, tenant: str, deadline: Optional[float], model_backend=None, bulk=True):
+    """
+    Score features, answering rows at or above the triage rule score
+    without the model. Returns the probabilities and the mask
+    of rule-resolved rows, or None when triage is off or a model variant was
+    requested explicitly.
+    """
+    if triage is None or (model_backend is not None and model_backend is not backend):
+        return await score_features(features, tenant, deadline, model_backend, bulk), None
+    rule_based = triage.resolve(features)
+    probabilities = rule_probabilities(len(features))
+    model_rows = ~rule_based
+    if model_rows.any():
+        # Only model time counts; queue wait and throttling would inflate the savings estimate
+        service_time = []
+        probabilities[model_rows] = await score_features(
+            features[model_rows], tenant, deadline, model_backend, bulk, service_time
+        )
+        triage.record_model(int(model_rows.sum()), sum(service_time))
+    return probabilities, rule_based
+
+def decode_batch_request(content_type: str, body: bytes):
+    """JSON batches go through pydantic validation; binary bodies are decoded column-wise"""
+    if content_type == JSON:
+        return features_from_requests(BatchPredictionRequest.model_validate_json(body).records)
+    return decode_batch(content_type, body)
+
+@app.post("/predict/batch")
+async def predict_batch(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None),
+    x_client_id: Optional[str] = Header(None),
+    x_deadline_ms: Optional[float] = Header(None),
+    x_model_id: Optional[str] = Header(None)
+):
+    """
+    Score a batch. JSON bodies use {"records": [...]}; MessagePack and Arrow
+    IPC bodies are decoded column-wise. The response format follows Accept,
+    defaulting to the request's content type.
+    """
+    if backend is None or scheduler is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    deadline = request_deadline(x_deadline_ms)
+    tenant = x_tenant_id or x_client_id or DEFAULT_TENANT
+    model_backend = await resolve_backend(x_model_id)
+    content_type = media_type(request.headers.get("content-type")) or JSON
+    response_type = negotiate(request.headers.get("accept"), content_type)
+    body = await request.body()
+    
+    try:
+        features = await run_in_threadpool(decode_batch_request, content_type, body)
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch: {str(e)}")
+    if len(features) == 0:
+        raise HTTPException(status_code=400, detail="Batch contains no records")
+    
+    try:
+        with job_runner.interactive() if job_runner is not None else nullcontext():
+            probabilities, rule_based = await triaged_scores(features, tenant, deadline, model_backend)
+        payload = await run_in_threadpool(encode_batch, response_type, probabilities, rule_based)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Request shed: {str(e)}")
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many queued requests: {str(e)}")
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    
+    if response_type == JSON:
+        return {"predictions": payload, "count": len(payload), "timestamp": datetime.now().isoformat()}
+    return Response(content=payload, media_type=response_type)
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None),
+    x_client_id: Optional[str] = Header(None),
+    x_deadline_ms: Optional[float] = Header(None),
+    x_model_id: Optional[str] = Header(None)
+):
+    """
+    Score an NDJSON, MessagePack object sequence or Arrow IPC body, returning
+    results chunk by chunk as NDJSON, MessagePack or an Arrow IPC stream.
+    The body is read before the response starts: StreamingResponse listens
+    for disconnects on the same receive channel, so reading the request
+    inside the generator would wait forever.
+    """
+    if backend is None or scheduler is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    deadline = request_deadline(x_deadline_ms)
+    tenant = x_tenant_id or x_client_id or DEFAULT_TENANT
+    model_backend = await resolve_backend(x_model_id)
+    content_type = media_type(request.headers.get("content-type")) or NDJSON
+    if content_type == JSON:
+        content_type = NDJSON
+    if content_type not in (NDJSON, MSGPACK, ARROW_STREAM, ARROW_FILE):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    response_type = negotiate(
+        request.headers.get("accept"), ARROW_STREAM if content_type == ARROW_FILE else content_type, STREAM_TYPES
+    )
+    
+    try:
+        decoder = StreamDecoder(content_type)
+        encoder = StreamEncoder(response_type)
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    body = await request.body()
     
-    normalized = []
-    for i, (feature_name, (min_val, max_val)) in enumerate(ranges.items()):
-        value = features[0][i]
-        normalized_value = 2 * (value - min_val) / (max_val - min_val) - 1
-        normalized_value = max(-1, min(1, normalized_value))
-        normalized.append(normalized_value)
+    async def results():
+        try:
+            # Decoding and encoding run off the event loop so large streams do not stall /predict
+            for start in range(0, len(body), STREAM_FEED_BYTES):
+                data = body[start:start + STREAM_FEED_BYTES]
+                for features in await run_in_threadpool(decoder.feed, data):
+                    scored = await triaged_scores(features, tenant, deadline, model_backend)
+                    yield await run_in_threadpool(encoder.encode, *scored)
+            for features in await run_in_threadpool(decoder.finish):
+                scored = await triaged_scores(features, tenant, deadline, model_backend)
+                yield await run_in_threadpool(encoder.encode, *scored)
+            yield await run_in_threadpool(encoder.close)
+        except Exception as e:
+            # Headers are already sent; report the failure in-band where the format allows
+            logger.error(f"Streaming prediction error: {str(e)}")
+            if response_type == NDJSON:
+                yield (json.dumps({"error": str(e)}) + "\n").encode()
     
-    return np.array([normalized])
+    return StreamingResponse(results(), media_type=response_type)
+
+@app.get("/models")
+async def model_stats():
+    """Resident models, memory use, load times and hit rates of the model cache"""
+    return {"primary": backend.describe() if backend is not None else None, "cache": model_registry.stats()}
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Per-tenant queue wait, served and shed counts"""
+    if scheduler is None:
+        raise HTTPException(status_code=500, detail="Scheduler not running")
+    return scheduler.stats()
+
+@app.get("/triage/stats")
+async def triage_stats():
+    """Share of requests and rows answered by the clinical rules, and the model time saved"""
+    if triage is None:
+        return {"enabled": False}
+    return triage.stats()
+
+@app.get("/capture/stats")
+async def capture_stats():
+    """Sampled, captured and dropped /predict requests of the traffic recorder"""
+    if traffic_recorder is None:
+        return {"enabled": False}
+    return traffic_recorder.stats()
+
+@app.get("/shadow/stats")
+async def shadow_stats():
+    """Disagreement and confidence differences between the primary and shadow models"""
+    if shadow is None:
+        return {"enabled": False}
+    return shadow.stats()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints exist only when profiling is enabled and ADMIN_TOKEN is set"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not profiling_enabled() or not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_process(seconds: float = 10, mode: str = "collapsed", interval_ms: float = 5):
+    """
+    Profile the live process for a fixed time. mode=collapsed samples every
+    thread's stack (flamegraph input); mode=pstats runs cProfile on the event
+    loop thread and returns a pstats dump.
+    """
+    global profile_session_active
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}")
+    if mode not in ("collapsed", "pstats"):
+        raise HTTPException(status_code=400, detail="mode must be 'collapsed' or 'pstats'")
+    if profile_session_active:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    
+    profile_session_active = True
+    try:
+        if mode == "pstats":
+            data = await profile_event_loop(seconds)
+            return Response(
+                content=data,
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": "attachment; filename=profile.pstats"}
+            )
+        sampler = StackSampler(interval=interval_ms / 1000)
+        await run_in_threadpool(sampler.run, seconds)
+        return PlainTextResponse(sampler.collapsed())
+    finally:
+        profile_session_active = False
+
+@app.get("/admin/profile/requests", dependencies=[Depends(require_admin)])
+async def get_request_profile():
+    """Collapsed stacks sampled while profiled /predict requests were in flight"""
+    return PlainTextResponse(request_profiler.sampler.collapsed(), headers={
+        f"X-Profile-{key.replace('_', '-')}": str(value) for key, value in request_profiler.stats().items()
+    })
+
+@app.put("/admin/profile/requests", dependencies=[Depends(require_admin)])
+async def configure_request_profile(fraction: float, reset: bool = False):
+    """Set the fraction of /predict requests to profile, optionally clearing collected stacks"""
+    if not 0 <= fraction <= 1:
+        raise HTTPException(status_code=400, detail="fraction must be between 0 and 1")
+    request_profiler.fraction = fraction
+    if reset:
+        request_profiler.reset()
+    return request_profiler.stats()
+
+def submit_job(features):
+    """Queue a scoring job and return its initial status"""
+    if job_runner is None:
+        raise HTTPException(status_code=500, detail="Batch job workers not running")
+    if len(features) == 0:
+        raise HTTPException(status_code=400, detail="Batch contains no records")
+    job_id = job_runner.submit(features)
+    return job_status(job_id)
+
+def job_status(job_id: str) -> dict:
+    job = job_runner.store.get_job(job_id) if job_runner is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs")
+async def create_job(request: BatchPredictionRequest):
+    """Submit an asynchronous scoring job with inline records"""
+    features = features_from_requests(request.records)
+    return await run_in_threadpool(submit_job, features)
+
+@app.post("/jobs/upload")
+async def upload_job(file: UploadFile = File(...)):
+    """Submit an asynchronous scoring job from an uploaded CSV or JSON file"""
+    content = await file.read()
+    try:
+        features = await run_in_threadpool(parse_batch_file, file.filename or "", content)
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch file: {str(e)}")
+    return await run_in_threadpool(submit_job, features)
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Batch job queue depth and throughput"""
+    if job_runner is None:
+        raise HTTPException(status_code=500, detail="Batch job workers not running")
+    return await run_in_threadpool(job_runner.stats)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll the status of a scoring job"""
+    return await run_in_threadpool(job_status, job_id)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, page: int = 1, page_size: int = 500):
+    """Fetch one page of results for a scoring job"""
+    if page < 1 or not 1 <= page_size <= 5000:
+        raise HTTPException(status_code=400, detail="page must be >= 1 and page_size between 1 and 5000")
+    
+    job = await run_in_threadpool(job_status, job_id)
+    offset = (page - 1) * page_size
+    rows = await run_in_threadpool(job_runner.store.get_results, job_id, offset, page_size)
+    has_more = offset + page_size < job["total_rows"]
+    
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "page": page,
+        "page_size": page_size,
+        "total_rows": job["total_rows"],
+        "processed_rows": job["processed_rows"],
+        "results": [{"row": row_index, **build_prediction(probabilities)} for row_index, probabilities in rows],
+        "next_page": page + 1 if has_more else None
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Multi-model serving: models are loaded lazily from a local directory and
+kept in an LRU cache bounded by their approximate resident memory.
+
+A model id maps to MODEL_DIR/<id>.pkl (complete or legacy pickle) or
+MODEL_DIR/<id>.onnx. Concurrent first requests for the same id share a
+single load.
+
+Each model is charged the growth in process RSS across its load and
+warm-up (at least its serialized size; the serialized size alone where RSS
+is unavailable). Loads are serialized so the measurements do not overlap,
+and room for the artifact size is made before loading so the cache stays
+near its budget while a model loads.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from inference_backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+
+def resident_set_bytes():
+    """Current RSS of this process from /proc, or None where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+MODEL_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class ModelNotFound(Exception):
+    """No artifact exists for the requested model id"""
+
+
+class ModelStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_seconds = None
+        self.memory_bytes = 0
+        self.memory_source = None
+        self.resident = False
+
+    def snapshot(self):
+        requests = self.hits + self.misses
+        return {
+            "resident": self.resident,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "last_load_seconds": self.last_load_seconds,
+            "memory_bytes": self.memory_bytes,
+            "memory_source": self.memory_source,
+        }
+
+
+class ModelRegistry:
+    """Thread-safe, memory-bounded LRU cache of inference backends"""
+
+    def __init__(self, model_dir, max_bytes, warmup=True):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.warmup = warmup
+        self.entries = OrderedDict()
+        self.loading = {}
+        self.model_stats = {}
+        self.resident_bytes = 0
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def _stats(self, model_id):
+        if model_id not in self.model_stats:
+            self.model_stats[model_id] = ModelStats()
+        return self.model_stats[model_id]
+
+    def artifact_path(self, model_id):
+        if not MODEL_ID_PATTERN.match(model_id):
+            raise ValueError(f"Invalid model id: {model_id}")
+        for extension, backend_name in ((".pkl", "xgboost"), (".onnx", "onnx")):
+            path = os.path.join(self.model_dir, model_id + extension)
+            if os.path.exists(path):
+                return path, backend_name
+        raise ModelNotFound(f"No model artifact for {model_id} in {self.model_dir}")
+
+    def get(self, model_id):
+        """Return the backend for model_id, loading it once if it is not resident"""
+        with self.lock:
+            stats = self._stats(model_id)
+            if model_id in self.entries:
+                self.entries.move_to_end(model_id)
+                stats.hits += 1
+                return self.entries[model_id]
+            stats.misses += 1
+            future = self.loading.get(model_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.loading[model_id] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            backend = self._load(model_id)
+            future.set_result(backend)
+            return backend
+        except Exception as e:
+            future.set_exception(e)
+            with self.lock:
+                # Do not keep stats for ids that never loaded
+                if not self._stats(model_id).loads:
+                    self.model_stats.pop(model_id, None)
+            raise
+        finally:
+            with self.lock:
+                self.loading.pop(model_id, None)
+
+    def _load(self, model_id):
+        path, backend_name = self.artifact_path(model_id)
+        with self.load_lock:
+            with self.lock:
+                self._evict(reserve=os.path.getsize(path))
+            rss_before = resident_set_bytes()
+            start = time.perf_counter()
+            backend = create_backend(backend_name, path)
+            if self.warmup:
+                backend.warmup()
+            load_seconds = time.perf_counter() - start
+            rss_after = resident_set_bytes()
+
+        if rss_before is None or rss_after is None:
+            size, source = backend.model_bytes(), "model_size"
+        else:
+            size, source = max(rss_after - rss_before, backend.model_bytes()), "rss"
+
+        with self.lock:
+            stats = self._stats(model_id)
+            stats.loads += 1
+            stats.last_load_seconds = load_seconds
+            stats.memory_bytes = size
+            stats.memory_source = source
+            stats.resident = True
+            self.entries[model_id] = backend
+            self.resident_bytes += size
+            self._evict(keep=model_id)
+
+        logger.info(f"Loaded model {model_id} from {path} in {load_seconds:.3f}s ({size} bytes, {source})")
+        return backend
+
+    def _evict(self, reserve=0, keep=None):
+        """Drop least recently used models until they and `reserve` bytes fit in max_bytes"""
+        for model_id in list(self.entries):
+            if self.resident_bytes + reserve <= self.max_bytes:
+                break
+            if model_id == keep:
+                continue
+            self.entries.pop(model_id)
+            stats = self._stats(model_id)
+            stats.evictions += 1
+            stats.resident = False
+            self.resident_bytes -= stats.memory_bytes
+            logger.info(f"Evicted model {model_id} ({stats.memory_bytes} bytes)")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "model_dir": self.model_dir,
+                "max_bytes": self.max_bytes,
+                "resident_bytes": self.resident_bytes,
+                "resident_models": list(self.entries),
+                "models": {model_id: stats.snapshot() for model_id, stats in self.model_stats.items()},
+            }
+
+
+def create_model_registry():
+    """Create a model registry configured from MODEL_DIR and MODEL_CACHE_MAX_BYTES"""
+    return ModelRegistry(
+        os.getenv("MODEL_DIR", "models"),
+        int(os.getenv("MODEL_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+    )
@@ -0,0 +1,343 @@
+"""
+Binary payload codecs for batch and streaming scoring.
+
+Requests are decoded straight into the (N, 6) float64 feature array in
+model units, skipping per-record pydantic validation; responses are
+encoded column-wise. Supported bodies:
+
+- MessagePack: a map of frontend field name -> list of values
+  (column-wise), or a list of per-record maps.
+- Arrow IPC (stream or file format): either a `features` column of
+  fixed_size_list<double>[6] already in model units, which maps onto the
+  feature array without copying, or one float column per frontend field.
+
+msgpack and pyarrow are optional and imported on first use.
+"""
+
+import io
+import json
+
+import numpy as np
+
+from inference_backends import RISK_LEVELS
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+
+MEDIA_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/jsonlines": NDJSON,
+}
+BATCH_TYPES = (JSON, MSGPACK, ARROW_STREAM, ARROW_FILE)
+STREAM_TYPES = (NDJSON, MSGPACK, ARROW_STREAM)
+
+# Frontend field order; blood_sugar is mg/dL and body_temp is Celsius
+FRONTEND_FIELDS = ['age', 'systolic_bp', 'diastolic_bp', 'blood_sugar', 'body_temp', 'heart_rate']
+
+RISK_SCORES = np.array([0, 50, 100])
+
+# Values of the optional `source` result column (see clinical_rules.Triage)
+SOURCES = ["model", "clinical_rules"]
+
+
+class UnsupportedMediaType(Exception):
+    """The body or the requested response type cannot be handled"""
+
+
+def media_type(header):
+    """Normalize a Content-Type or single Accept entry"""
+    value = (header or "").split(";")[0].strip().lower()
+    return MEDIA_ALIASES.get(value, value)
+
+
+def negotiate(accept, request_type, supported=BATCH_TYPES):
+    """Pick the response type from Accept, defaulting to the request's type"""
+    for entry in (accept or "").split(","):
+        candidate = media_type(entry)
+        if candidate in supported:
+            return candidate
+        if candidate in ("*/*", "application/*"):
+            break
+    return request_type if request_type in supported else JSON
+
+
+def _require_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise UnsupportedMediaType("MessagePack support requires the msgpack package") from e
+    return msgpack
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise UnsupportedMediaType("Arrow support requires the pyarrow package") from e
+    return pa
+
+
+def convert_frontend_array(features):
+    """Convert an (N, 6) array in FRONTEND_FIELDS units to model units in place"""
+    features[:, 3] /= 18.0                   # mg/dL -> mmol/L
+    features[:, 4] = features[:, 4] * 9/5 + 32  # Celsius -> Fahrenheit
+    return features
+
+
+def _validate(features):
+    if features.ndim != 2 or features.shape[1] != len(FRONTEND_FIELDS):
+        raise ValueError(f"Expected {len(FRONTEND_FIELDS)} features per record")
+    if not np.isfinite(features).all():
+        raise ValueError("Features must be finite numbers")
+    return features
+
+
+def features_from_columns(columns):
+    """Build model-unit features from a map of frontend field -> sequence"""
+    missing_fields = set(FRONTEND_FIELDS) - set(columns)
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {sorted(missing_fields)}")
+    try:
+        features = np.column_stack([np.asarray(columns[field], dtype=np.float64) for field in FRONTEND_FIELDS])
+    except TypeError as e:
+        raise ValueError(f"Columns must be sequences of numbers: {e}") from e
+    return convert_frontend_array(_validate(features))
+
+
+def features_from_records(records):
+    """Build model-unit features from a list of frontend records"""
+    try:
+        features = np.array([[record[field] for field in FRONTEND_FIELDS] for record in records], dtype=np.float64)
+    except KeyError as e:
+        raise ValueError(f"Missing required field: {e}") from e
+    except TypeError as e:
+        # Entries that are not maps, or values that are not numbers
+        raise ValueError(f"Records must be maps of numbers: {e}") from e
+    return convert_frontend_array(_validate(features.reshape(-1, len(FRONTEND_FIELDS))))
+
+
+def decode_msgpack(body):
+    obj = _require_msgpack().unpackb(body, raw=False)
+    return features_from_msgpack_object(obj)
+
+
+def features_from_msgpack_object(obj):
+    if isinstance(obj, dict):
+        return features_from_columns(obj)
+    if isinstance(obj, list):
+        return features_from_records(obj)
+    raise ValueError("MessagePack body must be a map of columns or a list of records")
+
+
+def features_from_arrow(batch):
+    """
+    Model-unit features for an Arrow table or record batch. A single-chunk
+    `features` fixed_size_list<double>[6] column is returned as a zero-copy view.
+    """
+    pa = _require_pyarrow()
+    if "features" in batch.schema.names:
+        column = batch.column("features")
+        if isinstance(column, pa.ChunkedArray):
+            column = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        if not pa.types.is_fixed_size_list(column.type) or column.type.list_size != len(FRONTEND_FIELDS):
+            raise ValueError("features column must be fixed_size_list<double>[6]")
+        values = column.flatten().to_numpy(zero_copy_only=column.null_count == 0 and column.type.value_type == pa.float64())
+        return _validate(values.astype(np.float64, copy=False).reshape(-1, len(FRONTEND_FIELDS)))
+
+    missing_fields = set(FRONTEND_FIELDS) - set(batch.schema.names)
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {sorted(missing_fields)}")
+    columns = {}
+    for field in FRONTEND_FIELDS:
+        column = batch.column(field)
+        if column.null_count:
+            raise ValueError(f"Column {field} contains nulls")
+        columns[field] = column.to_numpy()
+    return features_from_columns(columns)
+
+
+def read_arrow(body):
+    """Open an Arrow IPC body in stream or file format"""
+    pa = _require_pyarrow()
+    if body[:6] == b"ARROW1":
+        return pa.ipc.open_file(pa.BufferReader(body)).read_all()
+    return pa.ipc.open_stream(pa.BufferReader(body)).read_all()
+
+
+def iter_arrow_batches(body):
+    """Yield the record batches of an Arrow IPC body"""
+    pa = _require_pyarrow()
+    if body[:6] == b"ARROW1":
+        reader = pa.ipc.open_file(pa.BufferReader(body))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        yield from pa.ipc.open_stream(pa.BufferReader(body))
+
+
+def decode_batch(content_type, body):
+    """Decode a binary batch body into model-unit features"""
+    if content_type == MSGPACK:
+        return decode_msgpack(body)
+    if content_type in (ARROW_STREAM, ARROW_FILE):
+        return features_from_arrow(read_arrow(body))
+    raise UnsupportedMediaType(f"Unsupported content type: {content_type}")
+
+
+def result_columns(probabilities, rule_based=None):
+    """
+    Column-wise prediction results for an (N, 3) probability array. With a
+    rule_based mask, a `source` column tells rule-resolved rows from model rows.
+    """
+    predicted = probabilities.argmax(axis=1)
+    columns = {
+        "risk_level": np.array(RISK_LEVELS)[predicted],
+        "confidence": probabilities[np.arange(len(predicted)), predicted],
+        "score": RISK_SCORES[predicted],
+        "probabilities": {level: probabilities[:, i] for i, level in enumerate(RISK_LEVELS)},
+    }
+    if rule_based is not None:
+        columns["source"] = np.array(SOURCES)[rule_based.astype(np.int8)]
+    return columns
+
+
+def encode_json(probabilities, rule_based=None):
+    columns = result_columns(probabilities, rule_based)
+    probability_rows = np.column_stack([columns["probabilities"][level] for level in RISK_LEVELS]).tolist()
+    results = [
+        {
+            "risk_level": risk_level,
+            "confidence": confidence,
+            "probabilities": dict(zip(RISK_LEVELS, row)),
+            "score": score,
+        }
+        for risk_level, confidence, row, score in zip(
+            columns["risk_level"].tolist(), columns["confidence"].tolist(), probability_rows, columns["score"].tolist()
+        )
+    ]
+    if "source" in columns:
+        for result, source in zip(results, columns["source"].tolist()):
+            result["source"] = source
+    return results
+
+
+def encode_msgpack(probabilities, rule_based=None):
+    columns = result_columns(probabilities, rule_based)
+    payload = {
+        "risk_level": columns["risk_level"].tolist(),
+        "confidence": columns["confidence"].tolist(),
+        "score": columns["score"].tolist(),
+        "probabilities": {level: values.tolist() for level, values in columns["probabilities"].items()},
+    }
+    if "source" in columns:
+        payload["source"] = columns["source"].tolist()
+    return _require_msgpack().packb(payload)
+
+
+def arrow_result_batch(probabilities, rule_based=None):
+    pa = _require_pyarrow()
+    columns = result_columns(probabilities)
+    predicted = probabilities.argmax(axis=1).astype(np.int8)
+    arrays = [
+        pa.DictionaryArray.from_arrays(pa.array(predicted), pa.array(RISK_LEVELS)),
+        pa.array(columns["confidence"]),
+        pa.array(columns["score"].astype(np.int32)),
+    ] + [pa.array(np.ascontiguousarray(columns["probabilities"][level])) for level in RISK_LEVELS]
+    names = ["risk_level", "confidence", "score"] + [f"p_{level.split()[0]}" for level in RISK_LEVELS]
+    if rule_based is not None:
+        arrays.append(pa.DictionaryArray.from_arrays(pa.array(rule_based.astype(np.int8)), pa.array(SOURCES)))
+        names.append("source")
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def encode_arrow(probabilities, file_format=False, rule_based=None):
+    pa = _require_pyarrow()
+    batch = arrow_result_batch(probabilities, rule_based)
+    sink = pa.BufferOutputStream()
+    writer = pa.ipc.new_file(sink, batch.schema) if file_format else pa.ipc.new_stream(sink, batch.schema)
+    writer.write_batch(batch)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+def encode_batch(response_type, probabilities, rule_based=None):
+    """Encode batch results in the negotiated format; JSON returns a list of dicts"""
+    if response_type == MSGPACK:
+        return encode_msgpack(probabilities, rule_based)
+    if response_type == ARROW_STREAM:
+        return encode_arrow(probabilities, rule_based=rule_based)
+    if response_type == ARROW_FILE:
+        return encode_arrow(probabilities, file_format=True, rule_based=rule_based)
+    return encode_json(probabilities, rule_based)
+
+
+class StreamEncoder:
+    """Incrementally encode result chunks for a streaming response"""
+
+    def __init__(self, response_type):
+        self.response_type = response_type
+        self.sink = None
+        self.writer = None
+
+    def encode(self, probabilities, rule_based=None):
+        if self.response_type == MSGPACK:
+            return encode_msgpack(probabilities, rule_based)
+        if self.response_type == ARROW_STREAM:
+            pa = _require_pyarrow()
+            batch = arrow_result_batch(probabilities, rule_based)
+            if self.writer is None:
+                self.sink = io.BytesIO()
+                self.writer = pa.ipc.new_stream(self.sink, batch.schema)
+            self.writer.write_batch(batch)
+            return self._take()
+        return "".join(json.dumps(row) + "\n" for row in encode_json(probabilities, rule_based)).encode()
+
+    def close(self):
+        if self.writer is None:
+            return b""
+        self.writer.close()
+        return self._take()
+
+    def _take(self):
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+
+class StreamDecoder:
+    """Incrementally decode a streamed request body into feature chunks"""
+
+    def __init__(self, content_type):
+        self.content_type = content_type
+        self.buffer = b""
+        self.chunks = []
+        self.unpacker = _require_msgpack().Unpacker(raw=False) if content_type == MSGPACK else None
+
+    def feed(self, data):
+        """Return the list of feature arrays completed by `data`"""
+        if self.content_type == MSGPACK:
+            self.unpacker.feed(data)
+            return [features_from_msgpack_object(obj) for obj in self.unpacker]
+        if self.content_type in (ARROW_STREAM, ARROW_FILE):
+            # Arrow bodies are decoded once complete, batch by batch
+            self.chunks.append(data)
+            return []
+        self.buffer += data
+        lines = self.buffer.split(b"\n")
+        self.buffer = lines.pop()
+        records = [json.loads(line) for line in lines if line.strip()]
+        return [features_from_records(records)] if records else []
+
+    def finish(self):
+        """Return the feature arrays left once the body has ended"""
+        if self.content_type in (ARROW_STREAM, ARROW_FILE):
+            body = b"".join(self.chunks)
+            return [features_from_arrow(batch) for batch in iter_arrow_batches(body)] if body else []
+        if self.content_type == MSGPACK or not self.buffer.strip():
+            return []
+        return [features_from_records([json.loads(self.buffer)])]
@@ -0,0 +1,110 @@
+"""
+Content-addressed cache for the training pipeline stages in retrain_model.py.
+
+Each stage output is keyed by a hash of the stage's source code, its
+parameters, the keys of the stages it consumes and a pipeline-wide salt
+(helper source and library versions the stages depend on), and is stored
+as one .npy file per array so cached outputs can be memory-mapped on reuse.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import tempfile
+
+import numpy as np
+
+
+class StageCache:
+    """On-disk store of stage outputs under <root>/<stage>/<key>/"""
+
+    def __init__(self, root=".pipeline_cache", enabled=True, salt=None):
+        self.root = root
+        self.enabled = enabled
+        self.salt = salt
+        self.report = []
+
+    def key(self, stage_fn, params, inputs=()):
+        """Hash the stage implementation, its parameters, upstream keys and the salt"""
+        payload = json.dumps(
+            {
+                "stage": stage_fn.__name__,
+                "source": inspect.getsource(stage_fn),
+                "params": params,
+                "inputs": list(inputs),
+                "salt": self.salt,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def path(self, stage, key):
+        return os.path.join(self.root, stage, key)
+
+    def load(self, stage, key):
+        """Return the cached arrays and metadata for a stage, or None"""
+        directory = self.path(stage, key)
+        meta_path = os.path.join(directory, "meta.json")
+        if not self.enabled or not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in meta["arrays"]
+        }
+        return arrays, meta["extra"]
+
+    def save(self, stage, key, arrays, extra=None):
+        """Write a stage's outputs atomically: a crash never leaves a partial entry"""
+        if not self.enabled:
+            return
+        stage_dir = os.path.join(self.root, stage)
+        os.makedirs(stage_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=stage_dir, prefix=".tmp-")
+        try:
+            for name, array in arrays.items():
+                # np.asarray keeps 0-d arrays 0-d (np.ascontiguousarray would make them (1,))
+                np.save(os.path.join(staging, f"{name}.npy"), np.asarray(array), allow_pickle=False)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"arrays": sorted(arrays), "extra": extra or {}}, f)
+            os.replace(staging, self.path(stage, key))
+        except OSError:
+            # Another run published the same key first; its content is identical
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def run(self, stage_fn, params, inputs=(), upstream=None):
+        """
+        Run `stage_fn(params, *upstream)` unless its output is cached.
+        The stage must return (arrays, extra). Returns (key, arrays, extra).
+        """
+        stage = stage_fn.__name__.replace("stage_", "")
+        key = self.key(stage_fn, params, inputs)
+        start = time.perf_counter()
+
+        cached = self.load(stage, key)
+        if cached is not None:
+            arrays, extra = cached
+            status = "cached"
+        else:
+            arrays, extra = stage_fn(params, *(upstream or ()))
+            self.save(stage, key, arrays, extra)
+            status = "ran"
+
+        self.report.append((stage, key, status, time.perf_counter() - start))
+        return key, arrays, extra
+
+    def record(self, stage, status, seconds, key="-"):
+        """Add a stage that is not cached (e.g. export) to the timing report"""
+        self.report.append((stage, key, status, seconds))
+
+    def print_report(self):
+        print("\n⏱️  Pipeline stage timings:")
+        print(f"  {'stage':<10} {'key':<17} {'status':<7} {'seconds':>9}")
+        for stage, key, status, seconds in self.report:
+            print(f"  {stage:<10} {key:<17} {status:<7} {seconds:>9.3f}")
+        print(f"  {'total':<10} {'':<17} {'':<7} {sum(r[3] for r in self.report):>9.3f}")
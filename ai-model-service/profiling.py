@@ -0,0 +1,142 @@
+"""
+On-demand profiling of the running model service.
+
+StackSampler is a wall-clock statistical profiler: a background thread
+periodically captures the stack of every other thread (event loop,
+inference executor, batch and shadow workers) and counts them in the
+collapsed-stack format read by flamegraph.pl and speedscope.
+
+RequestProfiler runs the same sampler only while a sampled fraction of
+/predict requests is in flight. Nothing is installed unless
+PROFILING_ENABLED is set, so a disabled service pays no overhead.
+"""
+
+import os
+import sys
+import time
+import random
+import marshal
+import asyncio
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+MAX_PROFILE_SECONDS = 60
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Counts collapsed stacks of all threads sampled every `interval` seconds"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def sample_once(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            stacks.append(";".join(reversed(stack)))
+        with self.lock:
+            self.counts.update(stacks)
+            self.samples += 1
+
+    def run(self, seconds=None, keep_running=None):
+        """Sample for `seconds`, or for as long as `keep_running()` is true"""
+        deadline = time.monotonic() + seconds if seconds is not None else None
+        while (deadline is None or time.monotonic() < deadline) and (keep_running is None or keep_running()):
+            self.sample_once()
+            time.sleep(self.interval)
+
+    def collapsed(self):
+        with self.lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common()) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.samples = 0
+
+
+async def profile_event_loop(seconds):
+    """
+    Deterministically profile the event loop thread with cProfile for
+    `seconds` and return the marshalled pstats data (as written by
+    pstats.Stats.dump_stats). Work running on other threads is not included.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+class RequestProfiler:
+    """Samples all thread stacks while a sampled fraction of requests is in flight"""
+
+    def __init__(self, fraction=0.0, interval=0.002):
+        self.fraction = fraction
+        self.sampler = StackSampler(interval)
+        self.inflight = 0
+        self.profiled_requests = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def should_profile(self):
+        return self.fraction > 0 and random.random() < self.fraction
+
+    @contextmanager
+    def profiling(self):
+        with self.lock:
+            self.inflight += 1
+            self.profiled_requests += 1
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.sampler.run, kwargs={"keep_running": self._keep_running},
+                    name="request-profiler", daemon=True
+                )
+                self.thread.start()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+    def _keep_running(self):
+        with self.lock:
+            if self.inflight > 0:
+                return True
+            self.thread = None
+            return False
+
+    def stats(self):
+        return {
+            "fraction": self.fraction,
+            "profiled_requests": self.profiled_requests,
+            "samples": self.sampler.samples,
+        }
+
+    def reset(self):
+        self.sampler.reset()
+        self.profiled_requests = 0
+
+
+def profiling_enabled():
+    return os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
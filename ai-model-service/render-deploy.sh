@@ -24,4 +24,5 @@ echo "4. Use these settings:"
 echo "   - Root Directory: ai-model-service"
 echo "   - Build Command: pip install -r requirements.txt"
 echo "   - Start Command: uvicorn main:app --host 0.0.0.0 --port \$PORT"
+echo "   - Health Check Path: /ready (turns healthy after model warm-up)"
 echo "5. Deploy and get your URL!" 
\ No newline at end of file
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Replay captured /predict traffic (see traffic_capture.py) against a running
+service, at the original pacing or speeded up.
+
+Requests are sent in capture order at their original relative arrival
+times divided by --speed (0 sends as fast as the clients allow). Latency is
+measured from each request's scheduled send time, so time spent waiting
+for a free client counts (no coordinated omission). With a second target,
+either --compare-url or --compare-model-id, every request is sent to both
+and the predictions are diffed.
+
+Requests keep their captured tenant unless --tenant is given. If the
+target rate-limits tenants (TENANT_RATE), sped-up replays exceed the
+buckets the traffic was captured under; raise TENANT_RATE and
+TENANT_BURST (and TENANT_MAX_QUEUE_ROWS) on the target unless the
+throttling itself is being measured.
+
+Usage:
+  python replay_traffic.py captures/ --url http://localhost:8000 --speed 10
+  python replay_traffic.py captures/ --compare-url http://localhost:8001
+  python replay_traffic.py captures/ --model-id v1 --compare-model-id v2
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import numpy as np
+
+from payload_codecs import FRONTEND_FIELDS
+from inference_backends import RISK_LEVELS
+from traffic_capture import capture_files, load_capture
+
+local = threading.local()
+
+def post(url, model_id, payload, tenant, scheduled=None):
+    """
+    Send one request and return (status, latency_ms, response body or None,
+    send lag ms). Latency and lag are measured from `scheduled` when paced.
+    """
+    picked_up = time.perf_counter()
+    if not hasattr(local, "session"):
+        local.session = requests.Session()
+    headers = {"X-Tenant-ID": tenant}
+    if model_id:
+        headers["X-Model-Id"] = model_id
+    start = picked_up if scheduled is None else scheduled
+    try:
+        response = local.session.post(f"{url}/predict", json=payload, headers=headers, timeout=30)
+        status = response.status_code
+        body = response.json() if status == 200 else None
+    except (requests.RequestException, ValueError):
+        status, body = 0, None
+    lag = max(0.0, picked_up - scheduled) * 1000 if scheduled is not None else 0.0
+    return status, (time.perf_counter() - start) * 1000, body, lag
+
+def replay(records, targets, speed, concurrency, tenant):
+    """Send every record to every target on schedule; returns per-target results and elapsed seconds"""
+    payloads = [dict(zip(FRONTEND_FIELDS, features.tolist())) for features in records["features"]]
+    tenants = [tenant or name.decode(errors="ignore") or "replay" for name in records["tenant"]]
+    offsets = records["timestamp"] - records["timestamp"][0] if len(records) else np.array([])
+    futures = {label: [] for label, _, _ in targets}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        for payload, request_tenant, offset in zip(payloads, tenants, offsets):
+            scheduled = None
+            if speed > 0:
+                scheduled = start + offset / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            for label, url, model_id in targets:
+                futures[label].append(executor.submit(post, url, model_id, payload, request_tenant, scheduled))
+        results = {label: [future.result() for future in target_futures] for label, target_futures in futures.items()}
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+def summarize(results, elapsed):
+    statuses = np.array([status for status, _, _, _ in results])
+    latencies = [latency for status, latency, _, _ in results if status == 200]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(results),
+        "status_counts": {str(status): int(count) for status, count in zip(*np.unique(statuses, return_counts=True))},
+        "throughput_rps": float((statuses == 200).sum() / elapsed) if elapsed else 0.0,
+        "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(max(latencies, default=0.0))},
+    }
+
+def diff_predictions(baseline, candidate, records):
+    """Compare predictions for requests both targets answered"""
+    n = len(RISK_LEVELS)
+    confusion = np.zeros((n, n), dtype=np.int64)
+    confidence_diffs, probability_diffs, examples = [], [], []
+    for i, ((_, _, a, _), (_, _, b, _)) in enumerate(zip(baseline, candidate)):
+        if a is None or b is None:
+            continue
+        confusion[RISK_LEVELS.index(a["risk_level"]), RISK_LEVELS.index(b["risk_level"])] += 1
+        confidence_diffs.append(b["confidence"] - a["confidence"])
+        probability_diffs.append(max(abs(b["probabilities"][level] - a["probabilities"][level]) for level in RISK_LEVELS))
+        if a["risk_level"] != b["risk_level"] and len(examples) < 5:
+            examples.append({
+                "request": dict(zip(FRONTEND_FIELDS, records["features"][i].tolist())),
+                "baseline": a["risk_level"],
+                "candidate": b["risk_level"],
+            })
+    compared = int(confusion.sum())
+    disagreements = compared - int(np.trace(confusion))
+    return {
+        "compared": compared,
+        "disagreements": disagreements,
+        "disagreement_rate": disagreements / compared if compared else 0.0,
+        "risk_level_confusion": {
+            RISK_LEVELS[i]: {RISK_LEVELS[j]: int(confusion[i, j]) for j in range(n)} for i in range(n)
+        },
+        "mean_confidence_diff": float(np.mean(confidence_diffs)) if confidence_diffs else 0.0,
+        "max_abs_probability_diff": float(max(probability_diffs, default=0.0)),
+        "examples": examples,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="capture file or directory of capture files")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--model-id", help="X-Model-Id for the baseline target")
+    parser.add_argument("--compare-url", help="second instance to diff against")
+    parser.add_argument("--compare-model-id", help="X-Model-Id to diff against (on --compare-url or --url)")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing multiplier; 0 sends as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--tenant", help="send every request as this tenant instead of the captured one")
+    parser.add_argument("--report", help="write the summary as JSON to this path")
+    args = parser.parse_args()
+
+    records = load_capture(capture_files(args.capture))[:args.limit]
+    if len(records) == 0:
+        print("❌ No captured requests found")
+        return 1
+
+    targets = [("baseline", args.url, args.model_id)]
+    if args.compare_url or args.compare_model_id:
+        targets.append(("candidate", args.compare_url or args.url, args.compare_model_id))
+
+    span = records["timestamp"][-1] - records["timestamp"][0]
+    pacing = f"{args.speed:g}x" if args.speed > 0 else "unpaced"
+    print(f"🔁 Replaying {len(records)} requests captured over {span:.1f}s ({pacing})")
+    print("=" * 80)
+
+    results, elapsed = replay(records, targets, args.speed, args.concurrency, args.tenant)
+    lags = [lag for target_results in results.values() for _, _, _, lag in target_results]
+    report = {
+        "requests": len(records),
+        "capture_seconds": float(span),
+        "speed": args.speed,
+        "replay_seconds": elapsed,
+        "send_lag_ms_p99": float(np.percentile(lags, 99)) if lags else 0.0,
+        "targets": {},
+    }
+    for label, url, model_id in targets:
+        summary = summarize(results[label], elapsed)
+        report["targets"][label] = dict(summary, url=url, model_id=model_id)
+        latency = summary["latency_ms"]
+        print(f"\n{label}: {url}{f' (model {model_id})' if model_id else ''}")
+        print(f"  Status: {summary['status_counts']} | throughput {summary['throughput_rps']:.1f} req/s")
+        print(f"  Latency (200 only): p50 {latency['p50']:.1f} ms | p95 {latency['p95']:.1f} ms | p99 {latency['p99']:.1f} ms | max {latency['max']:.1f} ms")
+    if args.speed > 0:
+        print(f"\n⏱️  Send lag p99 {report['send_lag_ms_p99']:.1f} ms, included in latency (raise --concurrency if this grows)")
+
+    if len(targets) > 1:
+        diff = diff_predictions(results["baseline"], results["candidate"], records)
+        report["diff"] = diff
+        print(f"\n🔍 Prediction diff over {diff['compared']} requests answered by both")
+        print(f"  Risk level disagreements: {diff['disagreements']} ({diff['disagreement_rate'] * 100:.2f}%)")
+        print(f"  Mean confidence diff: {diff['mean_confidence_diff']:+.4f} | max |Δp|: {diff['max_abs_probability_diff']:.4f}")
+        for example in diff["examples"]:
+            print(f"  {example['baseline']} -> {example['candidate']}: {example['request']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,22 +5,38 @@ Script to retrain and save the maternal health risk model with correct module st
 
 import os
 import sys
+import copy
+import time
+import json
+import inspect
+import argparse
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, precision_recall_fscore_support
+import sklearn
+import imblearn
 import xgboost as xgb
 from imblearn.over_sampling import SMOTE
 
 # Import our custom class
 from maternal_risk_predictor import MaternalRiskPredictor
+from pipeline_cache import StageCache
+from inference_backends import XGBoostBackend
+import clinical_rules
+from clinical_rules import rule_risk_levels
 
-def create_synthetic_data():
+FEATURES = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
+RISK_LEVELS = ['low risk', 'mid risk', 'high risk']
+
+def create_synthetic_data(n_samples=1000, seed=42):
     """Create synthetic maternal health data for training"""
-    np.random.seed(42)
-    n_samples = 1000
+    np.random.seed(seed)
     
     # Generate synthetic data
     data = {
@@ -34,101 +50,162 @@ def create_synthetic_data():
     
     df = pd.DataFrame(data)
     
-    # Create risk levels based on clinical rules
-    risk_levels = []
-    for _, row in df.iterrows():
-        risk_score = 0
-        
-        # Age factors
-        if row['Age'] < 18 or row['Age'] > 35:
-            risk_score += 1
-        
-        # Blood pressure factors
-        if row['SystolicBP'] >= 140 or row['DiastolicBP'] >= 90:
-            risk_score += 2
-        elif row['SystolicBP'] < 90 or row['DiastolicBP'] < 60:
-            risk_score += 1
-        
-        # Blood sugar factors
-        if row['BS'] >= 11:  # High glucose
-            risk_score += 2
-        elif row['BS'] < 4:  # Low glucose
-            risk_score += 1
-        
-        # Temperature factors
-        if row['BodyTemp'] >= 100.4 or row['BodyTemp'] < 96:
-            risk_score += 1
-        
-        # Heart rate factors
-        if row['HeartRate'] > 100 or row['HeartRate'] < 60:
-            risk_score += 1
-        
-        # Determine risk level
-        if risk_score >= 4:
-            risk_levels.append('high risk')
-        elif risk_score >= 2:
-            risk_levels.append('mid risk')
-        else:
-            risk_levels.append('low risk')
+    # Create risk levels based on clinical rules (shared with the serving triage stage)
+    risk_levels = np.array(RISK_LEVELS)[rule_risk_levels(df[FEATURES].to_numpy())]
     
     df['RiskLevel'] = risk_levels
     return df
 
-def train_model():
-    """Train the maternal health risk prediction model"""
+DEFAULT_PARAMS = {
+    "generate": {"n_samples": 1000, "seed": 42},
+    "split": {"test_size": 0.2, "seed": 42},
+    "scale": {},
+    "balance": {"seed": 42},
+    "fit": {
+        "n_estimators": 100,
+        "max_depth": 6,
+        "learning_rate": 0.1,
+        "random_state": 42,
+        "eval_metric": "mlogloss",
+        "xgboost_version": xgb.__version__,
+    },
+    "evaluate": {},
+}
+
+def stage_generate(params):
+    """Generate the synthetic dataset as feature and encoded label arrays"""
+    df = create_synthetic_data(params["n_samples"], params["seed"])
+    y = np.array([MaternalRiskPredictor().target_encoding[label] for label in df['RiskLevel']])
+    return {"X": df[FEATURES].to_numpy(dtype=np.float64), "y": y}, {
+        "distribution": {label: int(count) for label, count in df['RiskLevel'].value_counts().items()}
+    }
+
+def stage_split(params, data):
+    """Stratified train/test split"""
+    # Stratify on the label strings so the split matches earlier DataFrame-based runs
+    X_train, X_test, y_train, y_test = train_test_split(
+        data["X"], data["y"], test_size=params["test_size"], random_state=params["seed"],
+        stratify=np.array(RISK_LEVELS)[data["y"]]
+    )
+    return {"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test}, {}
+
+def stage_scale(params, split):
+    """Fit the StandardScaler on the training split"""
+    scaler = StandardScaler().fit(pd.DataFrame(split["X_train"], columns=FEATURES))
+    return {
+        "X_train_scaled": scaler.transform(pd.DataFrame(split["X_train"], columns=FEATURES)),
+        "X_test_scaled": scaler.transform(pd.DataFrame(split["X_test"], columns=FEATURES)),
+        "mean": scaler.mean_,
+        "var": scaler.var_,
+        "scale": scaler.scale_,
+        "n_samples_seen": np.asarray(scaler.n_samples_seen_),
+    }, {}
+
+def stage_balance(params, scaled, split):
+    """Apply SMOTE for class balancing on the scaled training split"""
+    X_balanced, y_balanced = SMOTE(random_state=params["seed"]).fit_resample(
+        np.asarray(scaled["X_train_scaled"]), np.asarray(split["y_train"])
+    )
+    return {"X": X_balanced, "y": y_balanced}, {}
+
+def stage_fit(params, balanced):
+    """Train the XGBoost classifier and serialize it to a byte array"""
+    hyperparams = {k: v for k, v in params.items() if k != "xgboost_version"}
+    model = xgb.XGBClassifier(**hyperparams)
+    model.fit(np.asarray(balanced["X"]), np.asarray(balanced["y"]))
+    return {"model": model_to_array(model)}, {}
+
+def stage_evaluate(params, fitted, scaled, split):
+    """Evaluate the classifier on the held-out split"""
+    model = model_from_array(fitted["model"])
+    y_pred = model.predict(np.asarray(scaled["X_test_scaled"]))
+    y_pred_labels = [RISK_LEVELS[pred] for pred in y_pred]
+    y_test_labels = [RISK_LEVELS[label] for label in split["y_test"]]
+    return {"y_pred": np.asarray(y_pred)}, {
+        "accuracy": accuracy_score(y_test_labels, y_pred_labels),
+        "report": classification_report(y_test_labels, y_pred_labels),
+    }
+
+def model_to_array(model):
+    """Serialize an XGBClassifier (with its sklearn attributes) to a uint8 array"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        model.save_model(path)
+        with open(path, "rb") as f:
+            return np.frombuffer(f.read(), dtype=np.uint8)
+
+def model_from_array(array):
+    """Inverse of model_to_array"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        with open(path, "wb") as f:
+            f.write(np.asarray(array).tobytes())
+        model = xgb.XGBClassifier()
+        model.load_model(path)
+        return model
+
+def scaler_from_arrays(scaled):
+    """Rebuild the fitted StandardScaler from the scale stage outputs"""
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(scaled["mean"])
+    scaler.var_ = np.array(scaled["var"])
+    scaler.scale_ = np.array(scaled["scale"])
+    scaler.n_samples_seen_ = int(np.asarray(scaled["n_samples_seen"]).reshape(-1)[0])
+    scaler.n_features_in_ = len(FEATURES)
+    scaler.feature_names_in_ = np.array(FEATURES, dtype=object)
+    return scaler
+
+def pipeline_salt():
+    """Helper code and library versions the cached stage outputs depend on"""
+    helpers = [create_synthetic_data, model_to_array, model_from_array, scaler_from_arrays, clinical_rules]
+    return {
+        "helpers": [inspect.getsource(helper) for helper in helpers],
+        "versions": {
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__,
+            "imbalanced-learn": imblearn.__version__,
+            "xgboost": xgb.__version__,
+        },
+    }
+
+def create_cache(root=".pipeline_cache", enabled=True):
+    """Stage cache keyed on the pipeline salt as well as each stage"""
+    return StageCache(root, enabled=enabled, salt=pipeline_salt())
+
+def train_model(params=None, cache=None):
+    """Train the maternal health risk prediction model through the cached pipeline stages"""
+    params = params or DEFAULT_PARAMS
+    cache = cache or create_cache()
+    
     print("🔄 Creating synthetic training data...")
-    df = create_synthetic_data()
+    data_key, data, data_info = cache.run(stage_generate, params["generate"])
     
-    print(f"📊 Dataset shape: {df.shape}")
+    print(f"📊 Dataset shape: {data['X'].shape}")
     print(f"📊 Risk level distribution:")
-    print(df['RiskLevel'].value_counts())
+    for label, count in data_info["distribution"].items():
+        print(f"  {label}: {count}")
     
-    # Prepare features and target
-    features = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
-    X = df[features]
-    y = df['RiskLevel']
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    split_key, split, _ = cache.run(stage_split, params["split"], [data_key], [data])
+    scale_key, scaled, _ = cache.run(stage_scale, params["scale"], [split_key], [split])
+    balance_key, balanced, _ = cache.run(stage_balance, params["balance"], [scale_key, split_key], [scaled, split])
     
     print("🔄 Training model...")
+    fit_key, fitted, _ = cache.run(stage_fit, params["fit"], [balance_key], [balanced])
     
     # Create and configure the predictor
     predictor = MaternalRiskPredictor()
-    
-    # Scale the features
-    X_train_scaled = predictor.scaler.fit_transform(X_train)
-    X_test_scaled = predictor.scaler.transform(X_test)
-    
-    # Encode target variables
-    y_train_encoded = [predictor.target_encoding[label] for label in y_train]
-    y_test_encoded = [predictor.target_encoding[label] for label in y_test]
-    
-    # Apply SMOTE for class balancing
-    X_train_balanced, y_train_balanced = predictor.smote.fit_resample(X_train_scaled, y_train_encoded)
-    
-    # Train XGBoost model
-    predictor.model = xgb.XGBClassifier(
-        n_estimators=100,
-        max_depth=6,
-        learning_rate=0.1,
-        random_state=42,
-        eval_metric='mlogloss'
-    )
-    
-    predictor.model.fit(X_train_balanced, y_train_balanced)
+    predictor.scaler = scaler_from_arrays(scaled)
+    predictor.model = model_from_array(fitted["model"])
     predictor.is_fitted = True
     
     # Evaluate the model
-    y_pred = predictor.model.predict(X_test_scaled)
-    y_pred_labels = [predictor.reverse_encoding[pred] for pred in y_pred]
+    _, _, evaluation = cache.run(stage_evaluate, params["evaluate"], [fit_key, scale_key, split_key], [fitted, scaled, split])
     
     print("📊 Model Performance:")
-    print(f"Accuracy: {accuracy_score(y_test, y_pred_labels):.3f}")
+    print(f"Accuracy: {evaluation['accuracy']:.3f}")
     print("\nClassification Report:")
-    print(classification_report(y_test, y_pred_labels))
+    print(evaluation['report'])
     
     # Test the predict_risk method
     print("\n🧪 Testing predict_risk method:")
@@ -146,9 +223,8 @@ def train_model():
     
     return predictor
 
-def save_model(predictor):
+def save_model(predictor, model_path="maternal_health_risk_model_complete.pkl"):
     """Save the trained model"""
-    model_path = "maternal_health_risk_model_complete.pkl"
     
     print(f"💾 Saving model to {model_path}...")
     joblib.dump(predictor, model_path)
@@ -173,14 +249,229 @@ def save_model(predictor):
     print(f"✅ Model successfully saved to {model_path}")
     return model_path
 
+def train_fold(fold_index, X_train, y_train, X_test, y_test, params):
+    """Fit scaler, SMOTE and XGBoost on one fold's training rows and score its test rows"""
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(pd.DataFrame(X_train, columns=FEATURES))
+    X_train_scaled = scaler.transform(pd.DataFrame(X_train, columns=FEATURES))
+    X_test_scaled = scaler.transform(pd.DataFrame(X_test, columns=FEATURES))
+    
+    # SMOTE only ever sees this fold's training rows
+    X_balanced, y_balanced = SMOTE(random_state=params["balance"]["seed"]).fit_resample(X_train_scaled, y_train)
+    
+    hyperparams = {k: v for k, v in params["fit"].items() if k != "xgboost_version"}
+    # Folds already run in parallel processes
+    model = xgb.XGBClassifier(n_jobs=1, **hyperparams)
+    model.fit(X_balanced, y_balanced)
+    train_seconds = time.perf_counter() - start
+    
+    y_pred = model.predict(X_test_scaled)
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_test, y_pred, labels=list(range(len(RISK_LEVELS))), zero_division=0
+    )
+    return {
+        "fold": fold_index,
+        "train_seconds": train_seconds,
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "macro_f1": float(np.mean(f1)),
+        "per_class": {
+            level: {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1": float(f1[i]),
+                "support": int(support[i])
+            }
+            for i, level in enumerate(RISK_LEVELS)
+        },
+        "scaler": {"mean": scaler.mean_.tolist(), "var": scaler.var_.tolist(), "scale": scaler.scale_.tolist(),
+                   "n_samples_seen": int(scaler.n_samples_seen_)},
+        "model": model_to_array(model),
+    }
+
+def measure_serving_latency(fold_result, X, iterations=300, batch_size=256):
+    """Single-row and batch latency of a fold's model through the serving backend"""
+    predictor = MaternalRiskPredictor()
+    predictor.scaler = scaler_from_arrays(fold_result.pop("scaler"))
+    predictor.model = model_from_array(fold_result.pop("model"))
+    predictor.is_fitted = True
+    backend = XGBoostBackend(None, predictor).load()
+    backend.warmup()
+    
+    single = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        backend.predict_proba(X[i % len(X)][np.newaxis, :])
+        single.append((time.perf_counter() - start) * 1000)
+    
+    batch = np.resize(X, (batch_size, X.shape[1]))
+    batch_timings = []
+    for _ in range(max(1, iterations // 10)):
+        start = time.perf_counter()
+        backend.predict_proba(batch)
+        batch_timings.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        "single_row_ms": {"p50": float(np.percentile(single, 50)), "p95": float(np.percentile(single, 95))},
+        "batch_ms": {"batch_size": batch_size, "p50": float(np.percentile(batch_timings, 50)),
+                     "p95": float(np.percentile(batch_timings, 95))},
+        "batch_rows_per_second": float(batch_size / (np.median(batch_timings) / 1000)),
+    }
+
+def mean_std(values):
+    return {"mean": float(np.mean(values)), "std": float(np.std(values, ddof=1)) if len(values) > 1 else 0.0}
+
+def summarize_folds(folds):
+    """Aggregate fold metrics into means and standard deviations"""
+    return {
+        "accuracy": mean_std([f["accuracy"] for f in folds]),
+        "macro_f1": mean_std([f["macro_f1"] for f in folds]),
+        "per_class": {
+            level: {
+                metric: mean_std([f["per_class"][level][metric] for f in folds])
+                for metric in ("precision", "recall", "f1")
+            }
+            for level in RISK_LEVELS
+        },
+        "train_seconds": mean_std([f["train_seconds"] for f in folds]),
+        "single_row_p95_ms": mean_std([f["latency"]["single_row_ms"]["p95"] for f in folds]),
+        "batch_rows_per_second": mean_std([f["latency"]["batch_rows_per_second"] for f in folds]),
+    }
+
+def check_gate(summary, thresholds):
+    """Return the list of promotion thresholds the summary fails"""
+    failures = []
+    thresholds = {key: thresholds.get(key) for key in ("min_macro_f1", "min_high_risk_recall", "max_single_row_p95_ms")}
+    if thresholds["min_macro_f1"] is not None and summary["macro_f1"]["mean"] < thresholds["min_macro_f1"]:
+        failures.append(f"macro F1 {summary['macro_f1']['mean']:.3f} < {thresholds['min_macro_f1']}")
+    if thresholds["min_high_risk_recall"] is not None and \
+            summary["per_class"]["high risk"]["recall"]["mean"] < thresholds["min_high_risk_recall"]:
+        failures.append(f"high risk recall {summary['per_class']['high risk']['recall']['mean']:.3f} "
+                        f"< {thresholds['min_high_risk_recall']}")
+    if thresholds["max_single_row_p95_ms"] is not None and \
+            summary["single_row_p95_ms"]["mean"] > thresholds["max_single_row_p95_ms"]:
+        failures.append(f"single-row p95 {summary['single_row_p95_ms']['mean']:.3f} ms "
+                        f"> {thresholds['max_single_row_p95_ms']} ms")
+    return failures
+
+def evaluate_model(params, folds=5, jobs=None, thresholds=None, cache=None):
+    """Stratified k-fold evaluation with SMOTE inside each fold and serving latency per fold"""
+    cache = cache or create_cache()
+    _, data, _ = cache.run(stage_generate, params["generate"])
+    X, y = np.asarray(data["X"]), np.asarray(data["y"])
+    
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=params["generate"]["seed"])
+    print(f"🔄 Training {folds} folds in parallel...")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(train_fold, i, X[train_idx], y[train_idx], X[test_idx], y[test_idx], params)
+            for i, (train_idx, test_idx) in enumerate(splitter.split(X, y))
+        ]
+        fold_results = [future.result() for future in futures]
+    
+    # Latency is measured serially so parallel training does not skew it
+    print("⏱️  Measuring serving latency per fold...")
+    for fold_result in fold_results:
+        fold_result["latency"] = measure_serving_latency(fold_result, X)
+    
+    summary = summarize_folds(fold_results)
+    failures = check_gate(summary, thresholds or {})
+    return {
+        "created_at": datetime.now().isoformat(),
+        "folds": folds,
+        "params": params,
+        "per_fold": fold_results,
+        "summary": summary,
+        "gate": {"thresholds": thresholds, "passed": not failures, "failures": failures},
+    }
+
+def print_evaluation(report):
+    summary = report["summary"]
+    print(f"\n📊 {report['folds']}-fold cross-validation:")
+    print(f"Accuracy: {summary['accuracy']['mean']:.3f} ± {summary['accuracy']['std']:.3f}")
+    print(f"Macro F1: {summary['macro_f1']['mean']:.3f} ± {summary['macro_f1']['std']:.3f}")
+    print(f"  {'class':<10} {'precision':>16} {'recall':>16} {'f1':>16}")
+    for level, metrics in summary["per_class"].items():
+        cells = [f"{metrics[m]['mean']:.3f} ± {metrics[m]['std']:.3f}" for m in ("precision", "recall", "f1")]
+        print(f"  {level:<10} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16}")
+    print(f"Single-row p95 latency: {summary['single_row_p95_ms']['mean']:.3f} ms")
+    print(f"Batch throughput: {summary['batch_rows_per_second']['mean']:,.0f} rows/s")
+    gate = report["gate"]
+    print(f"\n{'✅ Promotion gate passed' if gate['passed'] else '❌ Promotion gate failed'}")
+    for failure in gate["failures"]:
+        print(f"  - {failure}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Train the maternal health risk model")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--n-samples", type=int, default=DEFAULT_PARAMS["generate"]["n_samples"])
+    common.add_argument("--seed", type=int, default=42)
+    common.add_argument("--test-size", type=float, default=DEFAULT_PARAMS["split"]["test_size"])
+    common.add_argument("--n-estimators", type=int, default=DEFAULT_PARAMS["fit"]["n_estimators"])
+    common.add_argument("--max-depth", type=int, default=DEFAULT_PARAMS["fit"]["max_depth"])
+    common.add_argument("--learning-rate", type=float, default=DEFAULT_PARAMS["fit"]["learning_rate"])
+    common.add_argument("--cache-dir", default=".pipeline_cache")
+    common.add_argument("--no-cache", action="store_true", help="Run every stage and do not write the cache")
+    
+    train = subparsers.add_parser("train", parents=[common], help="Run the cached training pipeline and export the model")
+    train.add_argument("--output", default="maternal_health_risk_model_complete.pkl")
+    
+    evaluate = subparsers.add_parser("evaluate", parents=[common], help="Stratified k-fold evaluation with latency report")
+    evaluate.add_argument("--folds", type=int, default=5)
+    evaluate.add_argument("--jobs", type=int, default=None, help="Parallel fold processes (default: CPU count)")
+    evaluate.add_argument("--report", default="evaluation_report.json")
+    evaluate.add_argument("--min-macro-f1", type=float, default=None)
+    evaluate.add_argument("--min-high-risk-recall", type=float, default=None)
+    evaluate.add_argument("--max-single-row-p95-ms", type=float, default=None)
+    return parser
+
+def params_from_args(args):
+    """Overlay command line options on DEFAULT_PARAMS"""
+    params = copy.deepcopy(DEFAULT_PARAMS)
+    params["generate"].update(n_samples=args.n_samples, seed=args.seed)
+    params["split"].update(test_size=args.test_size, seed=args.seed)
+    params["balance"].update(seed=args.seed)
+    params["fit"].update(
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        learning_rate=args.learning_rate,
+        random_state=args.seed
+    )
+    return params
+
+def run_evaluate(args):
+    thresholds = {
+        "min_macro_f1": args.min_macro_f1,
+        "min_high_risk_recall": args.min_high_risk_recall,
+        "max_single_row_p95_ms": args.max_single_row_p95_ms,
+    }
+    cache = create_cache(args.cache_dir, enabled=not args.no_cache)
+    report = evaluate_model(params_from_args(args), args.folds, args.jobs, thresholds, cache)
+    print_evaluation(report)
+    
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Evaluation report saved to {args.report}")
+    return 0 if report["gate"]["passed"] else 1
+
 if __name__ == "__main__":
+    args = build_parser().parse_args(sys.argv[1:] or ["train"])
+    
+    if args.command == "evaluate":
+        sys.exit(run_evaluate(args))
+    
     print("🚀 Starting model training...")
+    cache = create_cache(args.cache_dir, enabled=not args.no_cache)
     
     # Train the model
-    predictor = train_model()
+    predictor = train_model(params_from_args(args), cache)
     
     # Save the model
-    model_path = save_model(predictor)
+    start = time.perf_counter()
+    model_path = save_model(predictor, args.output)
+    cache.record("export", "ran", time.perf_counter() - start)
+    cache.print_report()
     
     print(f"🎉 Training complete! Model saved to {model_path}")
-    print("📁 You can now use this model file for deployment.") 
\ No newline at end of file
+    print("📁 You can now use this model file for deployment.")
\ No newline at end of file
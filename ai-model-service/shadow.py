@@ -0,0 +1,186 @@
+"""
+Shadow evaluation of a candidate model on live traffic.
+
+The primary prediction is returned first; its inputs and probabilities
+are then offered to a bounded queue that a background thread drains in
+batches through the candidate backend. Only bounded aggregates are kept
+in memory, plus an optional sampled JSON-lines log on local disk.
+"""
+
+import os
+import json
+import queue
+import random
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from inference_backends import RISK_LEVELS, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the |confidence difference| histogram buckets
+CONFIDENCE_BUCKETS = [0.01, 0.05, 0.1, 0.2, 0.5, 1.0]
+
+
+class ShadowEvaluator:
+    """Scores offered inputs with a candidate backend and aggregates disagreement"""
+
+    def __init__(self, candidate, max_queue=10000, batch_size=256, flush_interval=0.2,
+                 sample_rate=0.0, log_path=None, log_max_bytes=50 * 1024 * 1024):
+        self.candidate = candidate
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.log_path = log_path
+        self.log_max_bytes = log_max_bytes
+        self.stopping = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+        n = len(RISK_LEVELS)
+        self.compared = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+        self.confusion = np.zeros((n, n), dtype=np.int64)  # rows: primary, columns: candidate
+        self.confidence_diff_sum = 0.0
+        self.confidence_abs_diff_sum = 0.0
+        self.confidence_abs_diff_max = 0.0
+        self.probability_abs_diff_sum = np.zeros(n)
+        self.confidence_histogram = np.zeros(len(CONFIDENCE_BUCKETS), dtype=np.int64)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._worker, name="shadow-evaluator", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def offer(self, features, primary_probabilities):
+        """Queue one scored request for shadow evaluation without blocking"""
+        try:
+            self.queue.put_nowait((features, primary_probabilities))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def _worker(self):
+        while not self.stopping.is_set():
+            items = self._drain()
+            if items:
+                try:
+                    self._evaluate(items)
+                except Exception as e:
+                    logger.error(f"Shadow evaluation failed: {str(e)}")
+                    with self.lock:
+                        self.errors += 1
+
+    def _drain(self):
+        """Collect up to batch_size items, waiting at most flush_interval for the first"""
+        try:
+            items = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _evaluate(self, items):
+        X = np.vstack([features for features, _ in items])
+        primary = np.vstack([probabilities for _, probabilities in items])
+        candidate = self.candidate.predict_proba(X)
+
+        primary_labels = primary.argmax(axis=1)
+        candidate_labels = candidate.argmax(axis=1)
+        confidence_diff = candidate.max(axis=1) - primary.max(axis=1)
+        abs_diff = np.abs(confidence_diff)
+
+        with self.lock:
+            np.add.at(self.confusion, (primary_labels, candidate_labels), 1)
+            self.compared += len(items)
+            self.batches += 1
+            self.confidence_diff_sum += float(confidence_diff.sum())
+            self.confidence_abs_diff_sum += float(abs_diff.sum())
+            self.confidence_abs_diff_max = max(self.confidence_abs_diff_max, float(abs_diff.max()))
+            self.probability_abs_diff_sum += np.abs(candidate - primary).sum(axis=0)
+            buckets = np.minimum(np.searchsorted(CONFIDENCE_BUCKETS, abs_diff), len(CONFIDENCE_BUCKETS) - 1)
+            np.add.at(self.confidence_histogram, buckets, 1)
+
+        if self.log_path and self.sample_rate > 0:
+            self._log_samples(X, primary, candidate)
+
+    def _log_samples(self, X, primary, candidate):
+        sampled = [i for i in range(len(X)) if random.random() < self.sample_rate]
+        if not sampled:
+            return
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.log_max_bytes:
+            os.replace(self.log_path, self.log_path + ".1")
+        timestamp = datetime.now().isoformat()
+        with open(self.log_path, "a") as f:
+            for i in sampled:
+                f.write(json.dumps({
+                    "timestamp": timestamp,
+                    "features": X[i].tolist(),
+                    "primary": primary[i].tolist(),
+                    "candidate": candidate[i].tolist(),
+                }) + "\n")
+
+    def stats(self):
+        with self.lock:
+            compared = self.compared
+            disagreements = int(compared - np.trace(self.confusion))
+            return {
+                "enabled": True,
+                "candidate": self.candidate.describe(),
+                "compared": compared,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "batches": self.batches,
+                "queue_depth": self.queue.qsize(),
+                "disagreements": disagreements,
+                "disagreement_rate": disagreements / compared if compared else 0.0,
+                "risk_level_confusion": {
+                    primary_level: {
+                        candidate_level: int(self.confusion[i, j])
+                        for j, candidate_level in enumerate(RISK_LEVELS)
+                    }
+                    for i, primary_level in enumerate(RISK_LEVELS)
+                },
+                "confidence_diff": {
+                    "mean": self.confidence_diff_sum / compared if compared else 0.0,
+                    "mean_abs": self.confidence_abs_diff_sum / compared if compared else 0.0,
+                    "max_abs": self.confidence_abs_diff_max,
+                    "histogram": {
+                        f"<={edge}": int(count) for edge, count in zip(CONFIDENCE_BUCKETS, self.confidence_histogram)
+                    },
+                },
+                "mean_abs_probability_diff": {
+                    level: float(self.probability_abs_diff_sum[i] / compared) if compared else 0.0
+                    for i, level in enumerate(RISK_LEVELS)
+                },
+            }
+
+
+def create_shadow_evaluator():
+    """Create a shadow evaluator from SHADOW_* environment variables, or None if disabled"""
+    model_path = os.getenv("SHADOW_MODEL_PATH")
+    if not model_path:
+        return None
+    candidate = create_backend(os.getenv("SHADOW_BACKEND", "xgboost"), model_path)
+    logger.info(f"Shadow evaluation enabled with candidate {model_path}")
+    return ShadowEvaluator(
+        candidate,
+        max_queue=int(os.getenv("SHADOW_QUEUE_SIZE", "10000")),
+        batch_size=int(os.getenv("SHADOW_BATCH_SIZE", "256")),
+        sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "0")),
+        log_path=os.getenv("SHADOW_LOG_PATH", "shadow_log.jsonl"),
+    )
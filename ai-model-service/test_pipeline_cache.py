@@ -0,0 +1,50 @@
+"""
+Regression tests for the cached training pipeline in retrain_model.py.
+
+Runs the pipeline twice against the same cache directory: unchanged, and
+with only a fit hyperparameter changed. Both second runs must reuse every
+upstream stage from the cache and still build a working predictor.
+
+Usage: python test_pipeline_cache.py   (or: python -m pytest test_pipeline_cache.py)
+"""
+
+import copy
+import tempfile
+
+from retrain_model import DEFAULT_PARAMS, create_cache, train_model
+
+UPSTREAM_STAGES = ["generate", "split", "scale", "balance"]
+
+def small_params(**fit):
+    params = copy.deepcopy(DEFAULT_PARAMS)
+    params["generate"]["n_samples"] = 300
+    params["fit"].update(n_estimators=10, **fit)
+    return params
+
+def stage_statuses(cache):
+    return {stage: status for stage, _, status, _ in cache.report}
+
+def run_twice(first_params, second_params):
+    with tempfile.TemporaryDirectory() as root:
+        train_model(first_params, create_cache(root))
+        cache = create_cache(root)
+        predictor = train_model(second_params, cache)
+        return stage_statuses(cache), predictor
+
+def test_unchanged_rerun_reuses_every_stage():
+    statuses, predictor = run_twice(small_params(), small_params())
+    for stage in UPSTREAM_STAGES + ["fit", "evaluate"]:
+        assert statuses[stage] == "cached", f"{stage} was {statuses[stage]}"
+    assert predictor.scaler.n_samples_seen_ > 0
+
+def test_hyperparameter_change_reuses_upstream_stages():
+    statuses, predictor = run_twice(small_params(), small_params(max_depth=4))
+    for stage in UPSTREAM_STAGES:
+        assert statuses[stage] == "cached", f"{stage} was {statuses[stage]}"
+    assert statuses["fit"] == "ran"
+    assert predictor.model.get_params()["max_depth"] == 4
+
+if __name__ == "__main__":
+    for test in (test_unchanged_rerun_reuses_every_stage, test_hyperparameter_change_reuses_upstream_stages):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,94 @@
+"""
+End-to-end tests for the binary and streaming prediction endpoints against
+a real uvicorn server.
+
+Starts the service on a local port, posts NDJSON, MessagePack and Arrow
+IPC bodies to /predict/stream and checks that every record comes back
+scored, and checks that malformed MessagePack batches are rejected with
+400. msgpack and pyarrow cases are skipped when those optional packages
+are missing.
+
+Usage: python test_stream_endpoint.py   (or: python -m pytest test_stream_endpoint.py)
+"""
+
+import io
+import json
+import atexit
+import requests
+
+from benchmark_shadow import start_server
+from payload_codecs import FRONTEND_FIELDS
+from test_patients import test_patients, convert_to_api_format
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+PORT = 8765
+TIMEOUT = 30
+RECORDS = [convert_to_api_format(patient) for patient in test_patients]
+
+_server = {}
+
+def server_url():
+    """Start one server for all tests in this module"""
+    if "url" not in _server:
+        process, url = start_server(PORT, {})
+        atexit.register(process.kill)
+        _server["url"] = url
+    return _server["url"]
+
+def post_stream(body, content_type):
+    response = requests.post(f"{server_url()}/predict/stream", data=body,
+                             headers={"Content-Type": content_type}, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response
+
+def test_ndjson_stream_scores_every_record():
+    body = "".join(json.dumps(record) + "\n" for record in RECORDS).encode()
+    lines = [json.loads(line) for line in post_stream(body, "application/x-ndjson").text.splitlines() if line]
+    assert len(lines) == len(RECORDS), lines
+    assert all("risk_level" in line for line in lines), lines
+
+def test_msgpack_stream_scores_every_record():
+    if msgpack is None:
+        print("⚠️  msgpack not installed; skipped")
+        return
+    half = len(RECORDS) // 2
+    columns = [{field: [record[field] for record in part] for field in FRONTEND_FIELDS}
+               for part in (RECORDS[:half], RECORDS[half:])]
+    body = b"".join(msgpack.packb(part) for part in columns)
+    unpacker = msgpack.Unpacker(raw=False)
+    unpacker.feed(post_stream(body, "application/msgpack").content)
+    assert sum(len(result["risk_level"]) for result in unpacker) == len(RECORDS)
+
+def test_msgpack_batch_of_non_maps_is_rejected():
+    if msgpack is None:
+        print("⚠️  msgpack not installed; skipped")
+        return
+    response = requests.post(f"{server_url()}/predict/batch", data=msgpack.packb([1, 2]),
+                             headers={"Content-Type": "application/msgpack"}, timeout=TIMEOUT)
+    assert response.status_code == 400, response.text
+
+def test_arrow_stream_scores_every_record():
+    if pa is None:
+        print("⚠️  pyarrow not installed; skipped")
+        return
+    table = pa.table({field: [float(record[field]) for record in RECORDS] for field in FRONTEND_FIELDS})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=3):
+            writer.write_batch(batch)
+    content = post_stream(sink.getvalue(), "application/vnd.apache.arrow.stream").content
+    assert pa.ipc.open_stream(pa.BufferReader(content)).read_all().num_rows == len(RECORDS)
+
+if __name__ == "__main__":
+    for test in (test_ndjson_stream_scores_every_record, test_msgpack_stream_scores_every_record,
+                 test_msgpack_batch_of_non_maps_is_rejected, test_arrow_stream_scores_every_record):
+        test()
+        print(f"✅ {test.__name__}")
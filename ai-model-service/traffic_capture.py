@@ -0,0 +1,175 @@
+"""
+Sampled capture of live /predict traffic for offline replay.
+
+Each captured request is a fixed-size little-endian record: its arrival
+time (Unix seconds, float64), the six request fields exactly as the client
+sent them (FRONTEND_FIELDS order and units, float64) and the tenant id
+(UTF-8, truncated or NUL-padded to 16 bytes). Files start with an 8-byte
+magic and are append-only; a new file is started once the current one
+reaches max_file_bytes and the oldest files beyond max_files are deleted.
+
+The request path only enqueues without blocking; a background thread does
+the disk writes. Captures are read back with load_capture().
+"""
+
+import os
+import glob
+import time
+import queue
+import random
+import struct
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"IYACAP02"
+TENANT_BYTES = 16
+RECORD = struct.Struct(f"<d6d{TENANT_BYTES}s")
+RECORD_DTYPE = np.dtype([("timestamp", "<f8"), ("features", "<f8", (6,)), ("tenant", f"S{TENANT_BYTES}")])
+
+
+class TrafficRecorder:
+    """Writes a sampled stream of request inputs to rotating capture files"""
+
+    def __init__(self, directory, sample_rate=1.0, max_file_bytes=64 * 1024 * 1024, max_files=10,
+                 max_queue=10000, flush_interval=0.5):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+
+        self.offered = 0
+        self.captured = 0
+        self.dropped = 0
+        self.errors = 0
+        self.files_written = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._worker, name="traffic-capture", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def offer(self, values, tenant="", arrival=None):
+        """Sample one request's six frontend values and tenant without blocking"""
+        with self.lock:
+            self.offered += 1
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            self.queue.put_nowait(RECORD.pack(arrival or time.time(), *values, tenant.encode()[:TENANT_BYTES]))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def _worker(self):
+        try:
+            while not self.stopping.is_set() or not self.queue.empty():
+                records = self._drain()
+                if records:
+                    try:
+                        self._write(records)
+                    except OSError as e:
+                        logger.error(f"Traffic capture write failed: {str(e)}")
+                        with self.lock:
+                            self.errors += 1
+        finally:
+            if self.file is not None:
+                self.file.close()
+
+    def _drain(self):
+        """Collect all queued records, waiting at most flush_interval for the first"""
+        try:
+            records = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _write(self, records):
+        if self.file is None or self.file.tell() >= self.max_file_bytes:
+            self._rotate()
+        self.file.write(b"".join(records))
+        self.file.flush()
+        with self.lock:
+            self.captured += len(records)
+
+    def _rotate(self):
+        if self.file is not None:
+            self.file.close()
+        self.path = os.path.join(self.directory, f"capture-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.files_written}.bin")
+        self.file = open(self.path, "ab")
+        self.file.write(MAGIC)
+        self.files_written += 1
+        for old_path in capture_files(self.directory)[:-self.max_files]:
+            os.remove(old_path)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "enabled": True,
+                "directory": self.directory,
+                "sample_rate": self.sample_rate,
+                "offered": self.offered,
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "queue_depth": self.queue.qsize(),
+                "current_file": self.path,
+                "files": len(capture_files(self.directory)),
+            }
+
+
+def capture_files(path):
+    """Capture files under a directory, oldest first, or [path] for a single file"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "capture-*.bin")), key=os.path.getmtime)
+    return [path]
+
+
+def load_capture(paths):
+    """Read capture files into a structured array sorted by arrival time"""
+    chunks = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a traffic capture file")
+        body = data[len(MAGIC):]
+        # A crash can leave a partial last record; ignore it
+        usable = len(body) - len(body) % RECORD.size
+        chunks.append(np.frombuffer(body[:usable], dtype=RECORD_DTYPE))
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD_DTYPE)
+    return records[np.argsort(records["timestamp"], kind="stable")]
+
+
+def create_traffic_recorder():
+    """Create a recorder from CAPTURE_* environment variables, or None if CAPTURE_DIR is unset"""
+    directory = os.getenv("CAPTURE_DIR")
+    if not directory:
+        return None
+    logger.info(f"Traffic capture enabled in {directory}")
+    return TrafficRecorder(
+        directory,
+        sample_rate=float(os.getenv("CAPTURE_SAMPLE_RATE", "1.0")),
+        max_file_bytes=int(os.getenv("CAPTURE_MAX_FILE_BYTES", str(64 * 1024 * 1024))),
+        max_files=int(os.getenv("CAPTURE_MAX_FILES", "10")),
+        max_queue=int(os.getenv("CAPTURE_QUEUE_SIZE", "10000")),
+    )